@@ -3,13 +3,19 @@ import json
 import uuid
 import asyncio
 from pathlib import Path
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, session
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, session, jsonify
 from werkzeug.utils import secure_filename
 
 from core.flatten_aijson import JsonFlattener
 from core.excel_generator import generate_excel
 from core.ppt_generator import generate_ppt
 from core.ai_core import process_docx
+from core.genText import provider_stats
+from core.health import registry
+from core.scheduler import job_for, scheduler_stats
+from core.doc_cache import doc_cache_stats
+from core.stream_render import StreamRenderer
+from core.config import RENDER_PIPELINE_ENABLED
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
@@ -75,6 +81,43 @@ def upload_file():
     # 重定向到处理页面
     return redirect(url_for('process_files_route'))
 
+def process_then_render(file_paths, session_id, ai_output_dir, temp_output_dir, final_output_dir, output_formats):
+    """先完成全部文档的提取，再依次展平 JSON、生成 Excel 与 PPT"""
+    # 第一步：处理Word文档并生成JSON数据（单个文档按交互式作业优先调度）
+    asyncio.run(process_docx(
+        file_paths=file_paths,
+        output_dir=ai_output_dir,
+        output_filename='ai_json.json',
+        job=job_for(len(file_paths), name=session_id)
+    ))
+    
+    # 第二步：执行JSON展平处理
+    json_processor = JsonFlattener(
+        input_pattern=os.path.join(ai_output_dir, '*.json'),
+        output_dir=temp_output_dir
+    )
+    processed_data = json_processor.process_files()
+    
+    # 生成选定的输出格式
+    output_files = {}
+    
+    if 'excel' in output_formats:
+        # 生成Excel文件
+        excel_output_path = os.path.join(final_output_dir, 'ai_transcript.xlsx')
+        generate_excel(processed_data, excel_output_path)
+        output_files['excel'] = 'ai_transcript.xlsx'
+    
+    if 'ppt' in output_formats:
+        # 生成PPT文件
+        ppt_files = generate_ppt(
+            input_dir=ai_output_dir,
+            output_dir=final_output_dir
+        )
+        if ppt_files:
+            output_files['ppt'] = [os.path.basename(file) for file in ppt_files]
+    
+    return output_files
+
 @app.route('/process')
 def process_files_route():
     # 检查会话是否存在
@@ -102,37 +145,21 @@ def process_files_route():
         # 处理上传的文件
         file_paths = [os.path.join(session_dir, filename) for filename in filenames]
         
-        # 第一步：处理Word文档并生成JSON数据
-        asyncio.run(process_docx(
-            file_paths=file_paths,
-            output_dir=ai_output_dir,
-            output_filename='ai_json.json'
-        ))
-        
-        # 第二步：执行JSON展平处理
-        json_processor = JsonFlattener(
-            input_pattern=os.path.join(ai_output_dir, '*.json'),
-            output_dir=temp_output_dir
-        )
-        processed_data = json_processor.process_files()
-        
-        # 生成选定的输出格式
-        output_files = {}
-        
-        if 'excel' in output_formats:
-            # 生成Excel文件
-            excel_output_path = os.path.join(final_output_dir, 'ai_transcript.xlsx')
-            generate_excel(processed_data, excel_output_path)
-            output_files['excel'] = 'ai_transcript.xlsx'
-        
-        if 'ppt' in output_formats:
-            # 生成PPT文件
-            ppt_files = generate_ppt(
-                input_dir=ai_output_dir,
-                output_dir=final_output_dir
-            )
-            if ppt_files:
-                output_files['ppt'] = [os.path.basename(file) for file in ppt_files]
+        if RENDER_PIPELINE_ENABLED:
+            # 每个文档提取完成即渲染选定的输出格式，不等全部文档
+            formats = [fmt for fmt in ('excel', 'ppt') if fmt in output_formats]
+            with StreamRenderer(final_output_dir, formats=formats, temp_output_dir=temp_output_dir) as renderer:
+                asyncio.run(process_docx(
+                    file_paths=file_paths,
+                    output_dir=ai_output_dir,
+                    output_filename='ai_json.json',
+                    job=job_for(len(file_paths), name=session_id),
+                    on_document=renderer.add
+                ))
+                output_files = renderer.close()
+        else:
+            output_files = process_then_render(file_paths, session_id, ai_output_dir, temp_output_dir,
+                                               final_output_dir, output_formats)
         
         # 保存输出文件信息到会话
         session['output_files'] = output_files
@@ -164,6 +191,16 @@ def download_file(file_type, filename):
     
     return send_file(file_path, as_attachment=True, mimetype=mime_type)
 
+@app.route('/backends')
+def backends():
+    # 查询各 LLM 端点的熔断状态、各服务商的并发窗口与文档级缓存命中率
+    return jsonify({
+        'endpoints': registry.snapshot(),
+        'providers': provider_stats(),
+        'jobs': scheduler_stats(),
+        'doc_cache': doc_cache_stats()
+    })
+
 @app.route('/reset')
 def reset():
     # 清除会话
@@ -0,0 +1,57 @@
+'''
+@Project ：code 
+@File    ：bench_breaker.py
+@Author  ：Sito
+@Date    ：2025/3/19 15:00 
+@Description    ：第一个端点持续返回 500 时，对比有无熔断的请求次数与耗时
+
+运行：python -m bench.bench_breaker
+'''
+import sys
+import time
+import random
+import asyncio
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.genText as gt
+import core.limiter as lm
+import core.health as health
+from core.mock_llm import MockServer, MockConfig
+
+CHUNKS = 200
+
+
+async def run():
+    try:
+        return await asyncio.gather(*[gt.genText(f'prompt-{random.random()}', bypass_cache=True) for _ in range(CHUNKS)])
+    finally:
+        await gt.close_session()
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    health.logger.setLevel(logging.CRITICAL)
+    bad = gt.endpoint_name(0)
+    for enabled in (False, True):
+        gt.registry = health.HealthRegistry(enabled=enabled)
+        gt.PROVIDERS['ark'].limiter = lm.AdaptiveLimiter()
+        # 不在同一端点上重试 5xx，只观察失败切换的开销
+        gt.LLM_THROTTLE_RETRIES = 0
+        config = MockConfig(latency=0.2, content='{"ok": 1}', failing_models={bad})
+        with MockServer(config) as server:
+            gt.PROVIDERS['ark'].url = server.url
+            start = time.perf_counter()
+            results = asyncio.run(run())
+            elapsed = time.perf_counter() - start
+        valid = sum(1 for r in results if r != '{}')
+        print(f'[breaker={enabled}] requests to failing endpoint = {config.model_requests.get(bad, 0)}, '
+              f'total requests = {config.requests}, valid = {valid}/{CHUNKS}, wall = {elapsed:.2f}s')
+    print(gt.registry.snapshot())
+
+
+if __name__ == '__main__':
+    main()
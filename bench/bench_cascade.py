@@ -0,0 +1,79 @@
+'''
+@Project ：code 
+@File    ：bench_cascade.py
+@Author  ：Sito
+@Date    ：2025/3/24 16:00 
+@Description    ：对比只用强模型、只用快模型与级联模式的耗时和结果质量
+
+模拟服务中快模型（v3）0.3s 返回，但对“难”分块只给出否定词；强模型（r1）1.5s 返回，所有分块都能抽取。
+
+运行：python -m bench.bench_cascade
+'''
+import sys
+import json
+import time
+import asyncio
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.ai_core as ac
+import core.genText as gt
+import core.limiter as lm
+from core.mock_llm import MockServer, MockConfig
+
+FAST, STRONG = 'ep-20250219164708-nnn2f', 'ep-20250225145427-8546n'
+CHUNKS = 100
+HARD_EVERY = 5  # 每 5 个分块有 1 个难分块
+GOOD = {"A. 年轻人生活状态探讨": {"1、受访者": {"城市": "成都", "受访者": "张三"}}}
+DENIED = {"A. 年轻人生活状态探讨": {"1、受访者": {"城市": "未提及", "受访者": "未明确"}}}
+
+
+def responder(model, prompt):
+    hard = '难' in prompt.rsplit('表格', 1)[-1]
+    return json.dumps(DENIED if hard and model == FAST else GOOD, ensure_ascii=False)
+
+
+def chunks():
+    return [f'表格1\n序号 | 城市 | 受访者\n{i} | 成都 | 张三{"（难）" if i % HARD_EVERY == 0 else ""}'
+            for i in range(CHUNKS)]
+
+
+async def run():
+    original = ac.genText
+
+    async def uncached_genText(prompt, **kwargs):
+        return await original(prompt, bypass_cache=True, **kwargs)
+
+    ac.genText = uncached_genText
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*[ac.process(f'doc{i}', text) for i, text in enumerate(chunks())])
+    finally:
+        ac.genText = original
+        await gt.close_session()
+    return time.perf_counter() - start, results
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    modes = {'strong only': [[STRONG]], 'fast only': [[FAST]], 'cascade': [[FAST], [STRONG]]}
+    for name, tiers in modes.items():
+        ac.CASCADE_ENABLED = True
+        ac.CASCADE_TIERS = tiers
+        ac.cascade_outcomes = [{'calls': 0, 'accepted': 0, 'latency': 0.0} for _ in tiers]
+        gt.PROVIDERS['ark'].limiter = lm.AdaptiveLimiter(initial=32)
+        config = MockConfig(responder=responder, model_latency={FAST: 0.3, STRONG: 1.5})
+        with MockServer(config) as server:
+            gt.PROVIDERS['ark'].url = server.url
+            wall, results = asyncio.run(run())
+        good = sum(1 for _, j in results if j == GOOD)
+        tiers_report = [(s['endpoints'][0][-5:], s['calls'], s['accepted'], s['avg_latency']) for s in ac.cascade_stats()]
+        print(f'[{name:<11}] wall = {wall:.2f}s, good = {good}/{CHUNKS}, '
+              f'tiers (endpoint, calls, accepted, avg latency) = {tiers_report}')
+
+
+if __name__ == '__main__':
+    main()
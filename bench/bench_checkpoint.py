@@ -0,0 +1,100 @@
+'''
+@Project ：code 
+@File    ：bench_checkpoint.py
+@Author  ：Sito
+@Date    ：2025/3/26 14:00 
+@Description    ：在处理到一半时中断 process_docx，对比从头重跑与 resume 续跑的请求数和耗时，并核对合并结果一致
+
+运行：python -m bench.bench_checkpoint
+'''
+import sys
+import glob
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.ai_core as ac
+import core.genText as gt
+import core.limiter as lm
+import core.doc_cache as dc
+from docx import Document
+from core.chunker import chunk_tables
+from core.mock_llm import MockServer, MockConfig
+
+SMALL_BUDGET = 2000
+INTERRUPT_AFTER = 3.0  # 秒
+
+
+def extract_small(doc_path, template=None, saved=None):
+    """用较小的分块预算切分样例文档，得到较多的分块"""
+    tables = [[[cell.text.strip() for cell in row.cells] for row in table.rows] for table in Document(doc_path).tables]
+    return chunk_tables(tables, budget=SMALL_BUDGET)
+
+
+def responder(model, prompt):
+    """每个分块返回不同的总结标签，合并顺序不同会得到不同结果"""
+    tag = hashlib.md5(prompt.encode('utf-8')).hexdigest()[:6]
+    return json.dumps({"总结标签": {"总结标签": {"人群标签": tag}}})
+
+
+async def run(output_dir, resume, interrupt=None):
+    original = ac.genText
+
+    async def uncached_genText(prompt, **kwargs):
+        return await original(prompt, bypass_cache=True, **kwargs)
+
+    ac.genText = uncached_genText
+    try:
+        coro = ac.process_docx(output_dir=output_dir, resume=resume)
+        if interrupt is None:
+            return await coro
+        try:
+            await asyncio.wait_for(coro, interrupt)
+        except asyncio.TimeoutError:
+            return None
+    finally:
+        ac.genText = original
+        await gt.close_session()
+
+
+def timed(config, output_dir, resume, interrupt=None):
+    with MockServer(config) as server:
+        gt.PROVIDERS['ark'].url = server.url
+        gt.PROVIDERS['ark'].limiter = lm.AdaptiveLimiter(initial=4, max_window=4)
+        start = time.perf_counter()
+        result = asyncio.run(run(output_dir, resume, interrupt))
+        return result, time.perf_counter() - start
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    # 替换后的解析函数只在当前进程生效，不使用解析进程池
+    ac.extract_document = extract_small
+    ac.PARSE_WORKERS = 1
+    # 每次运行都要实际解析和请求，不使用文档级缓存
+    dc.DOC_CACHE_ENABLED = False
+    chunks = sum(len(extract_small(doc_path)) for doc_path in glob.glob('data/input/docx/*.docx'))
+
+    with tempfile.TemporaryDirectory() as reference_dir:
+        reference, _ = timed(MockConfig(latency=0.3, responder=responder), reference_dir, resume=False)
+
+    for resume in (False, True):
+        with tempfile.TemporaryDirectory() as output_dir:
+            first = MockConfig(latency=0.3, responder=responder)
+            timed(first, output_dir, resume=False, interrupt=INTERRUPT_AFTER)
+            second = MockConfig(latency=0.3, responder=responder)
+            result, elapsed = timed(second, output_dir, resume=resume)
+        print(f'[resume={resume!s:<5}] {chunks} chunks, interrupted after {first.requests} requests; '
+              f'rerun requests = {second.requests}, rerun wall = {elapsed:.2f}s, '
+              f'same result as uninterrupted run = {result == reference}')
+
+
+if __name__ == '__main__':
+    main()
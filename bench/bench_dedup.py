@@ -0,0 +1,66 @@
+'''
+@Project ：code 
+@File    ：bench_dedup.py
+@Author  ：Sito
+@Date    ：2025/3/24 10:30 
+@Description    ：模拟一批笔录中都带有相同的空白问卷表头，对比关闭 / 开启单飞合并时的请求数与耗时
+
+运行：python -m bench.bench_dedup
+'''
+import sys
+import time
+import asyncio
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.genText as gt
+import core.limiter as lm
+from core.mock_llm import MockServer, MockConfig
+from core.prompt_manager import get_extract_prompt
+from core.scheduler import Job, set_job, finish_job
+
+DOCS = 60
+TEMPLATE = '表格1\n序号 | 城市 | 受访者 | 年龄 | 职业\n | | | | '
+LATENCY = 0.5
+
+
+def batch():
+    """每篇笔录一个模板分块加一个内容分块"""
+    prompts = []
+    for i in range(DOCS):
+        prompts.append(get_extract_prompt(TEMPLATE))
+        prompts.append(get_extract_prompt(f'表格2\n受访者 | 年龄\n受访者{i} | {20 + i % 15}'))
+    return prompts
+
+
+async def run(prompts, job):
+    token = set_job(job)
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*[gt.genText(p, bypass_cache=True, hedge=False) for p in prompts])
+    finally:
+        await gt.close_session()
+        finish_job(job, token)
+    return time.perf_counter() - start
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    prompts = batch()
+    for enabled in (False, True):
+        gt.LLM_SINGLE_FLIGHT_ENABLED = enabled
+        gt.PROVIDERS['ark'].limiter = lm.AdaptiveLimiter(initial=16)
+        job = Job(f'single_flight={enabled}')
+        config = MockConfig(latency=LATENCY, content='{}')
+        with MockServer(config) as server:
+            gt.PROVIDERS['ark'].url = server.url
+            wall = asyncio.run(run(prompts, job))
+        print(f'[single_flight={enabled}] prompts = {len(prompts)}, http requests = {config.requests}, '
+              f'wall = {wall:.2f}s, {gt.dedup_stats(job)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+'''
+@Project ：code 
+@File    ：bench_doc_cache.py
+@Author  ：Sito
+@Date    ：2025/3/28 15:00 
+@Description    ：模拟同一批文档被重复上传（每次保存在新的 uuid 目录下），对比文档级缓存开启与关闭时的解析次数、LLM 请求数与耗时
+
+缓存均放在临时目录，不影响 data/cache 下的缓存。
+
+运行：python -m bench.bench_doc_cache
+'''
+import os
+import sys
+import glob
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+import contextlib
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.ai_core as ac
+import core.genText as gt
+import core.limiter as lm
+import core.doc_cache as dc
+import core.llm_cache as lc
+from core.mock_llm import MockServer, MockConfig
+from bench.bench_checkpoint import responder
+
+
+def upload(samples, upload_dir):
+    """把样例文档复制到新的会话目录，模拟 /upload"""
+    session_dir = os.path.join(upload_dir, str(uuid.uuid4()))
+    os.makedirs(session_dir)
+    paths = []
+    for sample in samples:
+        paths.append(shutil.copy(sample, session_dir))
+    return paths
+
+
+async def run(file_paths, output_dir, counter):
+    original = ac.extract_document
+
+    def counted_extract(doc_path, template=None, saved=None):
+        counter['parsed'] += 1
+        return original(doc_path, template, saved)
+
+    ac.extract_document = counted_extract
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            return await ac.process_docx(file_paths=file_paths, output_dir=output_dir)
+    finally:
+        ac.extract_document = original
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    # 统计解析次数需要在当前进程中解析
+    ac.PARSE_WORKERS = 1
+    samples = sorted(glob.glob('data/input/docx/*.docx'))
+    # (名称, 跳过文档级缓存, 分块路由)：最后一轮修改提示词配置，结果缓存失效，分块缓存仍可用
+    rounds = [('cold', False, True), ('re-upload', False, True), ('re-upload, doc cache bypassed', True, True),
+              ('re-upload, routing disabled', False, False)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dc._PATHS = {kind: os.path.join(tmp, f'{kind}.sqlite3') for kind in dc._PATHS}
+        lc._cache = lc.LLMCache(path=os.path.join(tmp, 'llm_cache.sqlite3'))
+        reference = None
+        config = MockConfig(latency=0.5, responder=responder)
+        print(f"{'round':>30} {'parsed':>7} {'requests':>9} {'wall(s)':>8} {'same':>5}")
+        with MockServer(config) as server:
+            gt.PROVIDERS['ark'].url = server.url
+            for name, bypass, routing in rounds:
+                ac.DOC_CACHE_BYPASS = bypass
+                ac.SECTION_ROUTING_ENABLED = routing
+                counter = {'parsed': 0}
+                requests = config.requests
+                file_paths = upload(samples, os.path.join(tmp, 'upload'))
+                start = time.perf_counter()
+                results = asyncio.run(run(file_paths, os.path.join(tmp, 'out'), counter))
+                elapsed = time.perf_counter() - start
+                values = list(results.values())
+                reference = reference or values
+                same = values == reference if routing else '-'
+                print(f'{name:>30} {counter["parsed"]:>7} {config.requests - requests:>9} {elapsed:>8.2f} {same!s:>5}')
+        print(f'doc cache stats : {dc.doc_cache_stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+'''
+@Project ：code 
+@File    ：bench_extract.py
+@Author  ：Sito
+@Date    ：2025/3/17 14:30 
+@Description    ：在 data/input/docx 样例上统计分块方式对 LLM 调用次数与提示词 token 的影响
+
+运行：python -m bench.bench_extract
+'''
+import sys
+import json
+import glob
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx import Document
+from core.chunker import chunk_tables, estimate_tokens, format_table
+from core.prompt_manager import get_extract_prompt, route_sections, level_label, EXTRACT_EXAMPLE
+
+LEGACY_CHUNK_SIZE = 10000
+
+
+def read_tables(doc_path):
+    doc = Document(doc_path)
+    return [[[cell.text.strip() for cell in row.cells] for row in table.rows] for table in doc.tables]
+
+
+def legacy_chunks(tables):
+    """原实现：每个表格单独成块，再按 10000 字符硬切"""
+    chunks = []
+    for idx, rows in enumerate(tables):
+        text = format_table(idx + 1, rows)
+        chunks.extend(text[i:i + LEGACY_CHUNK_SIZE] for i in range(0, len(text), LEGACY_CHUNK_SIZE))
+    return chunks
+
+
+def legacy_extract_prompt(rt):
+    """原提示词：每次调用都重新生成缩进 4 格的标签与示例"""
+    return f'''你是一个信息提取大师，你会根据提供的标签和对应的访谈内容，提取出相应的信息。其中访谈内容, 包括了笔录和相应的表格记录, 你会根据提供的内容, 收集信息, 并以要求的 json 格式进行输入。
+以下是你需要搜集的标签信息，其中包括了一级标签和一级标签下面的二级标签:
+{json.dumps(level_label, indent=4, ensure_ascii=False)}
+
+请你根据提供访谈的信息或相关的表格, 收集需要搜集的内容,并以json格式进行输出,。
+例如你发现了 "A. 年轻人生活状态探讨" 的 "1、受访者" 中二级标签 "城市" 是 “成都”, 并且"B. 波轮洗衣机购买全链路还原" 中 "12、购买过程" 中 "外观" 是 “外观不在意，不拿来选美；材质要求不高”，
+你只输出下面的json内容即可
+{json.dumps(EXTRACT_EXAMPLE, indent=4, ensure_ascii=False)}
+
+注意：没搜集到的内容不用输出，只输出搜集到的确切的内容，并且确保输出的json中的标签和提供的标签内容与格式保持一致，如果什么都没搜集到直接输出空json串即可。
+
+下面是一些访谈的信息或相关的表格:
+{rt}
+你的输出'''
+
+
+def routed_extract_prompt(rt):
+    return get_extract_prompt(rt, route_sections(rt))
+
+
+def small_chunks(tables):
+    return chunk_tables(tables, budget=2000)
+
+
+def prompt_tokens(chunks, build_prompt=get_extract_prompt):
+    return sum(estimate_tokens(build_prompt(chunk)) for chunk in chunks)
+
+
+def report(name, strategies, docs):
+    """
+    打印每种方式的调用次数与提示词 token
+
+    Args:
+        name: 报告标题
+        strategies: [(名称, 分块函数, 提示词函数)] 列表，分块函数接收表格列表返回分块文本列表
+        docs: [(文档名, 表格列表)] 列表
+    """
+    print(f'== {name}')
+    totals = {label: [0, 0] for label, _, _ in strategies}
+    for doc_name, tables in docs:
+        cells = []
+        for label, fn, build_prompt in strategies:
+            chunks = fn(tables)
+            tokens = prompt_tokens(chunks, build_prompt)
+            totals[label][0] += len(chunks)
+            totals[label][1] += tokens
+            cells.append(f'{label}: {len(chunks):>2} calls / {tokens:>6} tokens')
+        print(f'{doc_name:<10}', ' | '.join(cells))
+    base_calls, base_tokens = totals[strategies[0][0]]
+    for label, (calls, tokens) in totals.items():
+        print(f'{"total":<10} {label}: {calls} calls / {tokens} tokens '
+              f'(calls {calls - base_calls:+d}, tokens {100 * (tokens - base_tokens) / base_tokens:+.1f}%)')
+
+
+def main():
+    docs = [(Path(p).stem, read_tables(p)) for p in sorted(glob.glob('data/input/docx/*.docx'))]
+    report('chunking', [('legacy', legacy_chunks, legacy_extract_prompt),
+                        ('token', chunk_tables, legacy_extract_prompt)], docs)
+    report('prompt', [('indented', chunk_tables, legacy_extract_prompt),
+                      ('compact', chunk_tables, get_extract_prompt)], docs)
+    report('routing', [('full', chunk_tables, get_extract_prompt),
+                       ('routed', chunk_tables, routed_extract_prompt),
+                       ('full@2k', small_chunks, get_extract_prompt),
+                       ('routed@2k', small_chunks, routed_extract_prompt)], docs)
+    legacy_static = estimate_tokens(legacy_extract_prompt(''))
+    static = estimate_tokens(get_extract_prompt(''))
+    print(f'static prompt tokens per call: {legacy_static} -> {static}')
+
+
+if __name__ == '__main__':
+    main()
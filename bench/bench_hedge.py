@@ -0,0 +1,68 @@
+'''
+@Project ：code 
+@File    ：bench_hedge.py
+@Author  ：Sito
+@Date    ：2025/3/13 15:20 
+@Description    ：在带长尾延迟的本地模拟服务上对比顺序失败切换与对冲请求的单次调用延迟
+
+运行：python -m bench.bench_hedge
+'''
+import sys
+import time
+import random
+import asyncio
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.genText as gt
+import core.limiter as lm
+from core.mock_llm import MockServer, MockConfig
+
+CALLS = 300
+WARMUP = 200
+
+
+async def timed_call(hedge, latencies):
+    start = time.perf_counter()
+    await gt.genText(f'prompt-{random.random()}', bypass_cache=True, hedge=hedge)
+    latencies.append(time.perf_counter() - start)
+
+
+async def run(hedge):
+    latencies = []
+    try:
+        # 预热，积累延迟样本
+        await asyncio.gather(*[timed_call(hedge, []) for _ in range(WARMUP)])
+        await asyncio.gather(*[timed_call(hedge, latencies) for _ in range(CALLS)])
+    finally:
+        await gt.close_session()
+    return sorted(latencies)
+
+
+def pct(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    random.seed(7)
+    # 只观察对冲效果，不让并发窗口的排队时间混入延迟
+    gt.PROVIDERS['ark'].limiter.enabled = False
+    for hedge in (False, True):
+        gt._recent_latencies.clear()
+        config = MockConfig(latency=0.2, slow_ratio=0.05, slow_latency=4.0)
+        with MockServer(config) as server:
+            gt.PROVIDERS['ark'].url = server.url
+            start = time.perf_counter()
+            latencies = asyncio.run(run(hedge))
+            elapsed = time.perf_counter() - start
+        print(f'[hedge={hedge}] p50 = {pct(latencies, 0.5):.2f}s, p95 = {pct(latencies, 0.95):.2f}s, '
+              f'p99 = {pct(latencies, 0.99):.2f}s, max = {latencies[-1]:.2f}s, '
+              f'http requests = {config.requests} for {CALLS + WARMUP} calls, wall = {elapsed:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
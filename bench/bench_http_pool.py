@@ -0,0 +1,61 @@
+'''
+@Project ：code 
+@File    ：bench_http_pool.py
+@Author  ：Sito
+@Date    ：2025/3/12 10:40 
+@Description    ：对比 requests+线程池 与 aiohttp 共享连接池在本地模拟服务上的并发吞吐
+
+运行：python -m bench.bench_http_pool
+'''
+import sys
+import time
+import asyncio
+import logging
+import requests
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.genText as gt
+from core.mock_llm import MockServer, MockConfig
+
+CONCURRENCY = [50, 200, 1000]
+LATENCY = 0.2
+
+
+async def run_legacy(url, n):
+    """旧实现：每次 requests.post 新建连接，放到默认线程池执行"""
+    loop = asyncio.get_event_loop()
+    data = {"model": "mock", "messages": [{"role": "user", "content": "x"}], "temperature": 0.7}
+    tasks = [loop.run_in_executor(None, lambda: requests.post(url, json=data)) for _ in range(n)]
+    await asyncio.gather(*tasks)
+
+
+async def run_pooled(n):
+    """新实现：genText 通过共享连接池发起请求"""
+    try:
+        await asyncio.gather(*[gt.genText(f'x-{i}', bypass_cache=True) for i in range(n)])
+    finally:
+        await gt.close_session()
+
+
+def timed(coro):
+    start = time.perf_counter()
+    asyncio.run(coro)
+    return time.perf_counter() - start
+
+
+def main():
+    gt.logger.setLevel(logging.WARNING)
+    with MockServer(MockConfig(latency=LATENCY)) as server:
+        gt.PROVIDERS['ark'].url = server.url
+        print(f'mock latency = {LATENCY}s, pool size = {gt.PROVIDERS["ark"].pool_size}')
+        print(f"{'chunks':>8} {'legacy(s)':>10} {'pooled(s)':>10} {'speedup':>8}")
+        for n in CONCURRENCY:
+            legacy = timed(run_legacy(server.url, n))
+            pooled = timed(run_pooled(n))
+            print(f'{n:>8} {legacy:>10.2f} {pooled:>10.2f} {legacy / pooled:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+'''
+@Project ：code 
+@File    ：bench_incremental.py
+@Author  ：Sito
+@Date    ：2025/3/29 10:00 
+@Description    ：修订笔录中的几个单元格后重新提交，对比贪心切分与沿用之前切分点时重新请求的分块数
+
+先处理原文档，再处理修订后的文档（另存为新文件，内容哈希不同，不命中文档级结果缓存），
+统计第二次的 LLM 请求数，并与不使用任何缓存完整处理修订文档的结果核对。
+缓存均放在临时目录，不影响 data/cache 下的缓存。
+
+运行：python -m bench.bench_incremental
+'''
+import os
+import sys
+import glob
+import asyncio
+import logging
+import zipfile
+import tempfile
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.ai_core as ac
+import core.genText as gt
+import core.doc_cache as dc
+import core.llm_cache as lc
+from core.chunker import chunk_tables
+from core.docx_stream import iter_docx_tables
+from core.mock_llm import MockServer, MockConfig
+from bench.bench_checkpoint import responder
+
+SMALL_BUDGET = 2000  # 较小的预算，使每个文档有 20 个左右的分块
+EDITS = [1, 2, 4]  # 修改的单元格数
+APPENDED = '（修订：补充说明，受访者表示需要再确认一下具体的时间和价格）'
+
+
+def revise(source, path, edits):
+    """在大表格的不同位置各改一个单元格，另存为 path"""
+    with zipfile.ZipFile(source) as src:
+        xml = src.read('word/document.xml').decode('utf-8')
+        rows = list(iter_docx_tables(source))[-1]
+        for n in range(1, edits + 1):
+            for row in rows[len(rows) * n // (edits + 1):]:
+                cell = next((text for text in row if len(text) > 4 and xml.count(f'>{text}<') == 1), None)
+                if cell:
+                    xml = xml.replace(f'>{cell}<', f'>{cell}{APPENDED}<')
+                    break
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                data = xml.encode('utf-8') if item.filename == 'word/document.xml' else src.read(item.filename)
+                dst.writestr(item, data)
+
+
+async def run(file_path, output_dir, bypass=False):
+    original = ac.genText
+
+    async def genText(prompt, **kwargs):
+        return await original(prompt, bypass_cache=bypass, **kwargs)
+
+    ac.genText = genText
+    ac.DOC_CACHE_BYPASS = bypass
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            return await ac.process_docx(file_path=file_path, output_dir=output_dir)
+    finally:
+        ac.genText = original
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    ac.PARSE_WORKERS = 1
+    source = sorted(glob.glob('data/input/docx/*.docx'))[0]
+    print(f"{'chunking':>16} {'chunks':>7} {'edits':>6} {'first run':>10} {'revised run':>12} {'same':>5}")
+    for name, reuse_cuts in (('greedy', False), ('reuse cuts', True)):
+        for edits in EDITS:
+            with tempfile.TemporaryDirectory() as tmp:
+                dc._caches = {}
+                dc._PATHS = {kind: os.path.join(tmp, f'{kind}.sqlite3') for kind in dc._PATHS}
+                cuts = dc.CutSet(dc.get_doc_cache('cuts'), {'budget': SMALL_BUDGET}) if reuse_cuts else None
+                ac.extract_document = lambda doc_path, template=None, saved=None: chunk_tables(iter_docx_tables(doc_path),
+                                                                                               budget=SMALL_BUDGET, cuts=cuts)
+                lc._cache = lc.LLMCache(path=os.path.join(tmp, 'llm_cache.sqlite3'))
+                revised = os.path.join(tmp, 'revised.docx')
+                revise(source, revised, edits)
+                config = MockConfig(latency=0.2, responder=responder)
+                with MockServer(config) as server:
+                    gt.PROVIDERS['ark'].url = server.url
+                    counts = []
+                    for path in (source, revised):
+                        before = config.requests
+                        result = asyncio.run(run(path, os.path.join(tmp, 'out')))
+                        counts.append(config.requests - before)
+                    reference = asyncio.run(run(revised, os.path.join(tmp, 'out'), bypass=True))
+                chunks = len(chunk_tables(iter_docx_tables(source), budget=SMALL_BUDGET))
+                same = list(result.values()) == list(reference.values())
+                print(f'{name:>16} {chunks:>7} {edits:>6} {counts[0]:>10} {counts[1]:>12} {same!s:>5}')
+
+if __name__ == '__main__':
+    main()
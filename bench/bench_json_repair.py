@@ -0,0 +1,66 @@
+'''
+@Project ：code 
+@File    ：bench_json_repair.py
+@Author  ：Sito
+@Date    ：2025/3/21 11:00 
+@Description    ：在本地模拟服务上对比不修复 / 修复 JSON 时的请求次数、耗时与丢失的分块
+
+运行：python -m bench.bench_json_repair
+'''
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.genText as gt
+import core.limiter as lm
+from core.mock_llm import MockServer, MockConfig
+
+CALLS = 20
+OBJECT = {"A. 年轻人生活状态探讨": {"1、受访者": {"城市": "成都", "受访者": "胡梦莎"}},
+          "B. 波轮洗衣机购买全链路还原": {"12、购买过程": {"外观": "外观不在意，不拿来选美"}}}
+TEXT = json.dumps(OBJECT, ensure_ascii=False, indent=4)
+CASES = {
+    'trailing comma': TEXT.replace('"成都"', '"成都",').replace('}\n}', '},\n}'),
+    'prose around': '根据表格内容，提取结果如下：\n' + TEXT + '\n以上未提及的标签没有输出。',
+    'chinese quotes': TEXT.replace('"', '“', 1).replace('":', '”:', 1),
+    'truncated': TEXT[:-40],
+    'unusable': '抱歉，表格内容不足以提取任何标签。',
+}
+
+
+async def run():
+    results = []
+    start = time.perf_counter()
+    try:
+        for _ in range(CALLS):
+            results.append(await gt.genText(f'prompt-{random.random()}', bypass_cache=True, hedge=False))
+    finally:
+        await gt.close_session()
+    return time.perf_counter() - start, results
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    for name, content in CASES.items():
+        for repair in (False, True):
+            gt.LLM_JSON_REPAIR_ENABLED = repair
+            for k in gt.json_outcomes:
+                gt.json_outcomes[k] = 0
+            config = MockConfig(latency=0.2, content=content)
+            with MockServer(config) as server:
+                gt.PROVIDERS['ark'].url = server.url
+                wall, results = asyncio.run(run())
+            valid = sum(1 for r in results if r != '{}')
+            print(f'[{name:<14} repair={repair!s:<5}] http requests = {config.requests:>3}, '
+                  f'valid = {valid:>2}/{CALLS}, wall = {wall:.2f}s, {gt.json_stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+'''
+@Project ：code 
+@File    ：bench_limiter.py
+@Author  ：Sito
+@Date    ：2025/3/12 16:10 
+@Description    ：在会注入 429 的本地模拟服务上对比无限制并发与 AIMD 自适应并发
+
+运行：python -m bench.bench_limiter
+'''
+import sys
+import time
+import asyncio
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.genText as gt
+import core.limiter as lm
+import core.health as health
+from core.limiter import AdaptiveLimiter
+from core.mock_llm import MockServer, MockConfig
+
+CHUNKS = 400
+SERVER_CAPACITY = 24
+LATENCY = 0.1
+
+
+async def run_batch(limiter):
+    gt.PROVIDERS['ark'].limiter = limiter
+    samples = []
+
+    async def sample():
+        while True:
+            samples.append(limiter.stats())
+            await asyncio.sleep(0.2)
+
+    sampler = asyncio.create_task(sample())
+    try:
+        results = await asyncio.gather(*[gt.genText(f'x-{i}', bypass_cache=True) for i in range(CHUNKS)])
+    finally:
+        sampler.cancel()
+        await gt.close_session()
+    return results, samples
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    health.logger.setLevel(logging.CRITICAL)
+    for name, enabled in (('unbounded', False), ('adaptive', True)):
+        config = MockConfig(latency=LATENCY, max_concurrency=SERVER_CAPACITY)
+        with MockServer(config) as server:
+            gt.PROVIDERS['ark'].url = server.url
+            limiter = AdaptiveLimiter(enabled=enabled)
+            start = time.perf_counter()
+            results, samples = asyncio.run(run_batch(limiter))
+            elapsed = time.perf_counter() - start
+        stats = limiter.stats()
+        print(f'[{name}] {elapsed:.2f}s, http requests = {config.requests}, 429 = {config.throttled}, '
+              f'peak server in-flight = {config.peak_in_flight}, final window = {stats["window"]}')
+        if enabled:
+            print('  window trace:', [s['window'] for s in samples])
+            print('  queue trace: ', [s['queue_depth'] for s in samples])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+'''
+@Project ：code 
+@File    ：bench_merged_cells.py
+@Author  ：Sito
+@Date    ：2025/3/27 17:00 
+@Description    ：对比合并单元格按 python-docx 方式重复（repeat）与只输出一次（span）时，每个样例文档的表格 token 数
+
+- 样例：data/input/docx 下的笔录
+- 构造：问答表格的回答单元格横跨 3 列、同一受访者的多行回答纵向合并，是笔录模板常见的排版
+
+运行：python -m bench.bench_merged_cells
+'''
+import os
+import sys
+import glob
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx import Document
+from core.chunker import chunk_tables, estimate_tokens
+from core.docx_stream import iter_docx_tables
+
+
+ANSWER = '外观不在意，不拿来选美；材质要求不高，主要看容量和洗得干不干净，平时一周洗三到五次。'
+
+
+def build_merged_docx(path, questions=40):
+    """问答表格：第 1 列问题，第 2-4 列合并为回答，每两行回答纵向合并"""
+    doc = Document()
+    table = doc.add_table(rows=questions + 1, cols=4)
+    table.cell(0, 0).text = '问题'
+    table.cell(0, 1).merge(table.cell(0, 3)).text = '回答'
+    for i in range(1, questions + 1, 2):
+        table.cell(i, 0).text = f'问题{i}'
+        table.cell(i + 1, 0).text = f'问题{i + 1}'
+        table.cell(i, 1).merge(table.cell(i + 1, 3)).text = ANSWER
+    doc.save(path)
+
+
+def document_tokens(path, merged):
+    chunks = chunk_tables(iter_docx_tables(path, merged))
+    return sum(estimate_tokens(chunk) for chunk in chunks), len(chunks)
+
+
+def main():
+    print(f"{'document':>12} {'repeat':>8} {'span':>8} {'saved':>7} {'chunks':>7}")
+    tmp = tempfile.TemporaryDirectory()
+    merged_doc = os.path.join(tmp.name, 'merged.docx')
+    build_merged_docx(merged_doc)
+    for path in sorted(glob.glob('data/input/docx/*.docx')) + [merged_doc]:
+        repeat, repeat_chunks = document_tokens(path, 'repeat')
+        span, span_chunks = document_tokens(path, 'span')
+        print(f'{os.path.basename(path):>12} {repeat:>8} {span:>8} {1 - span / repeat:>7.1%} '
+              f'{repeat_chunks:>3}->{span_chunks:<3}')
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+'''
+@Project ：code 
+@File    ：bench_pack.py
+@Author  ：Sito
+@Date    ：2025/3/18 11:00 
+@Description    ：按 process_docx 的实际流程，对比每个分块一次请求与合并请求的调用次数、提示词 token 和耗时
+
+运行：python -m bench.bench_pack
+'''
+import os
+import sys
+import glob
+import time
+import asyncio
+import logging
+import tempfile
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.ai_core as ai_core
+import core.genText as gt
+import core.limiter as lm
+import core.doc_cache as dc
+from core.chunker import estimate_tokens
+from core.mock_llm import MockServer, MockConfig
+from bench.bench_checkpoint import extract_small, SMALL_BUDGET
+
+
+async def run(pack, counter, output_dir):
+    """按 process_docx 的实际流程处理样例文档，pack 决定是否合并请求"""
+    original = ai_core.genText
+
+    async def counting_genText(prompt, **kwargs):
+        counter['calls'] += 1
+        counter['tokens'] += estimate_tokens(prompt)
+        return await original(prompt, bypass_cache=True, **kwargs)
+
+    ai_core.genText = counting_genText
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            return await ai_core.process_docx(output_dir=output_dir, pack=pack)
+    finally:
+        ai_core.genText = original
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    dc.DOC_CACHE_ENABLED = False
+    ai_core.PARSE_WORKERS = 1
+    ai_core.extract_document = extract_small
+    chunks = sum(len(extract_small(doc_path)) for doc_path in glob.glob('data/input/docx/*.docx'))
+    print(f'{chunks} chunks from data/input/docx at {SMALL_BUDGET}-token budget')
+    for pack in (False, True):
+        counter = {'calls': 0, 'tokens': 0}
+        config = MockConfig(latency=0.5, max_concurrency=8, prefill_delay=0.05)
+        with MockServer(config) as server, tempfile.TemporaryDirectory() as tmp:
+            gt.PROVIDERS['ark'].url = server.url
+            gt.PROVIDERS['ark'].limiter = lm.AdaptiveLimiter()
+            start = time.perf_counter()
+            results = asyncio.run(run(pack, counter, tmp))
+            elapsed = time.perf_counter() - start
+        print(f'[pack={pack}] calls = {counter["calls"]}, prompt tokens = {counter["tokens"]}, '
+              f'wall = {elapsed:.2f}s, documents = {len(results)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+'''
+@Project ：code 
+@File    ：bench_parse_pool.py
+@Author  ：Sito
+@Date    ：2025/3/28 10:00 
+@Description    ：对比在事件循环线程中逐个解析文档与在进程池中并行解析时，process_docx 发出第一个 LLM 请求的时间和总耗时
+
+模拟一次上传多份长篇笔录：把样例文档放大 SCALE 倍后复制成 DOCS 份，LLM 为本地模拟服务。
+进程池耗时包含首次创建进程池的启动时间。
+
+运行：python -m bench.bench_parse_pool
+'''
+import os
+import sys
+import glob
+import time
+import re
+import asyncio
+import contextlib
+import logging
+import tempfile
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.ai_core as ac
+import core.genText as gt
+import core.limiter as lm
+import core.doc_cache as dc
+from core.mock_llm import MockServer, MockConfig
+from bench.bench_docx_stream import build_scaled_docx
+
+DOCS = 16
+SCALE = 5
+WORKERS = [1, 2, 4]
+
+
+def build_variant(source, path, n):
+    """复制 source，并在每段文字前加上文档编号，使各份文档的分块互不相同"""
+    with zipfile.ZipFile(source) as src, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename == 'word/document.xml':
+                data = re.sub(rb'(<w:t(?: [^>]*)?>)', rb'\g<1>' + str(n).encode(), data)
+            dst.writestr(item, data)
+
+
+async def run(file_paths, output_dir):
+    original = ac.process
+    first = []
+
+    async def timed_process(doc_path, text):
+        if not first:
+            first.append(time.perf_counter())
+        return await original(doc_path, text)
+
+    async def uncached_genText(prompt, **kwargs):
+        return await genText(prompt, bypass_cache=True, **kwargs)
+
+    genText = ac.genText
+    ac.process, ac.genText = timed_process, uncached_genText
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            await ac.process_docx(file_paths=file_paths, output_dir=output_dir)
+    finally:
+        ac.process, ac.genText = original, genText
+    return first[0] - start, time.perf_counter() - start
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    # 每次运行都要实际解析和请求，不使用文档级缓存
+    dc.DOC_CACHE_ENABLED = False
+    sample = sorted(glob.glob('data/input/docx/*.docx'))[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'scaled.docx')
+        build_scaled_docx(sample, SCALE, source)
+        file_paths = []
+        for n in range(DOCS):
+            path = os.path.join(tmp, f'doc_{n}.docx')
+            build_variant(source, path, n)
+            file_paths.append(path)
+
+        rows = []
+        for workers in WORKERS:
+            ac.PARSE_WORKERS = workers
+            ac._parse_pool = None
+            config = MockConfig(latency=0.5)
+            with MockServer(config) as server:
+                gt.PROVIDERS['ark'].url = server.url
+                gt.PROVIDERS['ark'].limiter = lm.AdaptiveLimiter(initial=16, max_window=16)
+                first, wall = asyncio.run(run(file_paths, os.path.join(tmp, 'out')))
+                rows.append((workers, first, wall, config.requests))
+            if ac._parse_pool is not None:
+                ac._parse_pool.shutdown()
+
+    print(f'{DOCS} docs x {SCALE}x sample, {os.cpu_count()} cpu(s)')
+    print(f"{'workers':>8} {'first request(s)':>17} {'wall(s)':>8} {'requests':>9}")
+    for workers, first, wall, requests in rows:
+        print(f'{workers:>8} {first:>17.2f} {wall:>8.2f} {requests:>9}')
+
+
+if __name__ == '__main__':
+    main()
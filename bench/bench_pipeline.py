@@ -0,0 +1,85 @@
+'''
+@Project ：code 
+@File    ：bench_pipeline.py
+@Author  ：Sito
+@Date    ：2025/3/29 15:00 
+@Description    ：对比先解析完整个文档再请求（eager）与边解析边请求（lazy）时，process_docx 发出第一个请求的时间和总耗时
+
+模拟一份长篇笔录：把样例文档放大 SCALE 倍，在当前线程中解析，LLM 为本地模拟服务，不使用文档级缓存。
+
+运行：python -m bench.bench_pipeline
+'''
+import os
+import sys
+import glob
+import time
+import asyncio
+import logging
+import tempfile
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.ai_core as ac
+import core.genText as gt
+import core.limiter as lm
+import core.doc_cache as dc
+from core.mock_llm import MockServer, MockConfig
+from bench.bench_checkpoint import responder
+from bench.bench_docx_stream import build_scaled_docx
+
+SCALE = 30
+
+
+async def run(file_path, output_dir):
+    original = ac.process
+    first = []
+
+    async def timed_process(doc_path, text):
+        if not first:
+            first.append(time.perf_counter())
+        return await original(doc_path, text)
+
+    async def uncached_genText(prompt, **kwargs):
+        return await genText(prompt, bypass_cache=True, **kwargs)
+
+    genText = ac.genText
+    ac.process, ac.genText = timed_process, uncached_genText
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            result = await ac.process_docx(file_path=file_path, output_dir=output_dir)
+    finally:
+        ac.process, ac.genText = original, genText
+    return first[0] - start, time.perf_counter() - start, result
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    dc.DOC_CACHE_ENABLED = False
+    ac.PARSE_WORKERS = 1
+    lazy = ac.extract_document
+    modes = [('eager', lambda doc_path, template=None, saved=None: list(lazy(doc_path, template, saved))), ('lazy', lazy)]
+    sample = sorted(glob.glob('data/input/docx/*.docx'))[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'long.docx')
+        build_scaled_docx(sample, SCALE, path)
+        print(f'{SCALE}x sample, {len(list(lazy(path)))} chunks')
+        print(f"{'mode':>6} {'first request(s)':>17} {'wall(s)':>8} {'same':>5}")
+        reference = None
+        for name, extract in modes:
+            ac.extract_document = extract
+            config = MockConfig(latency=0.5, responder=responder)
+            with MockServer(config) as server:
+                gt.PROVIDERS['ark'].url = server.url
+                gt.PROVIDERS['ark'].limiter = lm.AdaptiveLimiter(initial=16, max_window=16)
+                first, wall, result = asyncio.run(run(path, os.path.join(tmp, 'out')))
+            reference = reference or result
+            print(f'{name:>6} {first:>17.2f} {wall:>8.2f} {result == reference!s:>5}')
+        ac.extract_document = lazy
+
+
+if __name__ == '__main__':
+    main()
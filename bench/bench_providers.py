@@ -0,0 +1,85 @@
+'''
+@Project ：code 
+@File    ：bench_providers.py
+@Author  ：Sito
+@Date    ：2025/3/21 17:00 
+@Description    ：三个本地模拟服务分别扮演 ark / ecloud / siliconflow，各自限制并发（超出返回 429），
+对比只用 ark 与三家分摊时的总耗时与吞吐；ecloud 的模拟服务按移动云网关的格式返回 state/body 信封，
+最后一组让 ecloud 网关全部返回 state=ERROR，核对失败被识别并由其余两家补上
+
+运行：python -m bench.bench_providers
+'''
+import sys
+import time
+import random
+import asyncio
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.genText as gt
+import core.limiter as lm
+from core.health import registry
+from core.providers import build_providers
+from core.mock_llm import MockServer, MockConfig
+
+CALLS = 300
+QUOTA = 8  # 每家服务商允许的并发
+LATENCY = 0.2
+
+
+SPECS = [
+    {'type': 'ark', 'name': 'ark', 'max_concurrency': QUOTA},
+    {'type': 'ecloud', 'name': 'ecloud', 'access_key': 'ak', 'secret_key': 'sk',
+     'models': ['deepseek'], 'max_concurrency': QUOTA},
+    {'type': 'siliconflow', 'name': 'siliconflow', 'apikey': 'sk-mock',
+     'models': ['Qwen/QwQ-32B'], 'max_concurrency': QUOTA}
+]
+
+
+def specs(urls):
+    return [dict(spec, url=url) for spec, url in zip(SPECS, urls)]
+
+
+async def run():
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*[gt.genText(f'prompt-{random.random()}', bypass_cache=True, hedge=False)
+                                         for _ in range(CALLS)])
+    finally:
+        await gt.close_session()
+    return time.perf_counter() - start, results
+
+
+def mock_config(spec, ecloud_error_rate=0.0):
+    if spec['type'] == 'ecloud':
+        return MockConfig(latency=LATENCY, content='{"a": 1}', max_concurrency=QUOTA, envelope='ecloud',
+                          error_rate=ecloud_error_rate)
+    return MockConfig(latency=LATENCY, content='{"a": 1}', max_concurrency=QUOTA)
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    for name, count, ecloud_error_rate in (('providers=1', 1, 0.0), ('providers=3', 3, 0.0),
+                                           ('providers=3, ecloud state=ERROR', 3, 1.0)):
+        servers = [MockServer(mock_config(spec, ecloud_error_rate)).start() for spec in SPECS[:count]]
+        try:
+            gt.set_providers(build_providers(specs([s.url for s in servers]), ark_backends=[('key', 'ep-mock')]))
+            wall, results = asyncio.run(run())
+        finally:
+            for server in servers:
+                server.stop()
+        valid = sum(1 for r in results if r != '{}')
+        served = {name: server.config.requests - server.config.throttled
+                  for name, server in zip(gt.PROVIDERS, servers)}
+        throttled = sum(s.config.throttled for s in servers)
+        ecloud = gt.PROVIDERS.get('ecloud')
+        state = next((h['state'] for h in registry.snapshot() if ecloud and h['name'] == ecloud.backends[0].name), None)
+        print(f'[{name}] wall = {wall:.2f}s, throughput = {CALLS / wall:.1f} calls/s, '
+              f'valid = {valid}/{CALLS}, 429 = {throttled}, served = {served}, ecloud breaker = {state}')
+
+
+if __name__ == '__main__':
+    main()
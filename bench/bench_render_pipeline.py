@@ -0,0 +1,140 @@
+'''
+@Project ：code
+@File    ：bench_render_pipeline.py
+@Author  ：Sito
+@Date    ：2025/3/31 11:00
+@Description    ：对比全部提取完成后再生成 Excel/PPT（barrier）与每个文档提取完成即渲染（stream）时，
+最后一个 LLM 回复到输出文件就绪的时间（tail）和总耗时，并核对两种方式生成的 Excel 与 PPT 内容一致
+
+- 文档：样例文档各复制 COPIES 份（每份文字带编号，分块互不相同）
+- LLM：本地模拟服务，并发上限 CONCURRENCY，使各文档陆续完成；不使用缓存
+
+运行：python -m bench.bench_render_pipeline
+'''
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import asyncio
+import logging
+import tempfile
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from openpyxl import load_workbook
+from pptx import Presentation
+import core.ai_core as ac
+import core.genText as gt
+import core.limiter as lm
+import core.doc_cache as dc
+from core.mock_llm import MockServer, MockConfig
+from core.flatten_aijson import JsonFlattener
+from core.excel_generator import generate_excel
+from core.ppt_generator import generate_ppt
+from core.stream_render import StreamRenderer
+from bench.bench_parse_pool import build_variant
+
+COPIES = 4
+CONCURRENCY = 4
+
+
+def responder(model, prompt):
+    """按分块内容填写受访者与若干标签，使 Excel 与 PPT 都有内容"""
+    tag = hashlib.md5(prompt.encode('utf-8')).hexdigest()[:6]
+    return json.dumps({
+        "A. 年轻人生活状态探讨": {
+            "1、受访者": {"序号": str(int(tag, 16) % 100), "城市": "上海", "受访者": tag, "核心发现": f"发现{tag}"},
+            "3、基本信息": {"年龄": "28", "行业及职业": f"职业{tag}"},
+        },
+        "总结标签": {"总结标签": {"人群标签": tag}},
+    }, ensure_ascii=False)
+
+
+async def extract(file_paths, output_dir, on_document=None):
+    async def uncached_genText(prompt, **kwargs):
+        return await genText(prompt, bypass_cache=True, **kwargs)
+
+    genText = ac.genText
+    ac.genText = uncached_genText
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            await ac.process_docx(file_paths=file_paths, output_dir=output_dir, on_document=on_document)
+    finally:
+        ac.genText = genText
+
+
+def run_barrier(file_paths, tmp):
+    ai_dir, temp_dir, out_dir = (os.path.join(tmp, 'barrier', name) for name in ('ai', 'temp', 'out'))
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    asyncio.run(extract(file_paths, ai_dir))
+    extracted = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        data = JsonFlattener(input_pattern=os.path.join(ai_dir, '*.json'), output_dir=temp_dir).process_files()
+        generate_excel(data, os.path.join(out_dir, 'ai_transcript.xlsx'))
+        excel = time.perf_counter()
+        generate_ppt(input_dir=ai_dir, output_dir=out_dir)
+    end = time.perf_counter()
+    stages = {'extract': round(extracted - start, 2), 'excel': round(excel - extracted, 2), 'ppt': round(end - excel, 2)}
+    return end - extracted, end - start, stages, out_dir
+
+
+def run_stream(file_paths, tmp):
+    ai_dir, temp_dir, out_dir = (os.path.join(tmp, 'stream', name) for name in ('ai', 'temp', 'out'))
+    start = time.perf_counter()
+    with StreamRenderer(out_dir, temp_output_dir=temp_dir) as renderer:
+        asyncio.run(extract(file_paths, ai_dir, on_document=renderer.add))
+        extracted = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            renderer.close()
+    end = time.perf_counter()
+    return end - extracted, end - start, renderer.stats(), out_dir
+
+
+def excel_content(path):
+    ws = load_workbook(path).active
+    widths = {key: dim.width for key, dim in ws.column_dimensions.items()}
+    return list(ws.iter_rows(values_only=True)), sorted(map(str, ws.merged_cells.ranges)), widths
+
+
+def ppt_content(path):
+    return [[shape.text_frame.text for shape in slide.shapes if shape.has_text_frame] for slide in Presentation(path).slides]
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    dc.DOC_CACHE_ENABLED = False
+    samples = sorted(glob.glob('data/input/docx/*.docx'))
+    with tempfile.TemporaryDirectory() as tmp:
+        file_paths = []
+        for n in range(COPIES):
+            for sample in samples:
+                path = os.path.join(tmp, 'docx', f'{n}_{os.path.basename(sample)}')
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                build_variant(sample, path, n)
+                file_paths.append(path)
+        print(f'{len(file_paths)} documents, mock LLM concurrency {CONCURRENCY}')
+        print(f"{'mode':>8} {'tail(s)':>8} {'wall(s)':>8}  stages")
+        outputs = {}
+        for name, run in (('barrier', run_barrier), ('stream', run_stream)):
+            config = MockConfig(latency=0.5, responder=responder)
+            with MockServer(config) as server:
+                gt.PROVIDERS['ark'].url = server.url
+                gt.PROVIDERS['ark'].limiter = lm.AdaptiveLimiter(initial=CONCURRENCY, max_window=CONCURRENCY)
+                tail, wall, stages, out_dir = run(file_paths, tmp)
+            outputs[name] = out_dir
+            print(f'{name:>8} {tail:>8.2f} {wall:>8.2f}  {stages}')
+        same_excel = excel_content(os.path.join(outputs['barrier'], 'ai_transcript.xlsx')) == \
+            excel_content(os.path.join(outputs['stream'], 'ai_transcript.xlsx'))
+        same_ppt = ppt_content(os.path.join(outputs['barrier'], 'ai_json_new.pptx')) == \
+            ppt_content(os.path.join(outputs['stream'], 'ai_json_new.pptx'))
+        print(f'same excel = {same_excel}, same ppt = {same_ppt}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+'''
+@Project ：code 
+@File    ：bench_scheduler.py
+@Author  ：Sito
+@Date    ：2025/3/25 15:00 
+@Description    ：三个线程模拟 Flask 的并发请求：一个 50 篇笔录的批量作业运行中，随后提交一个单文档作业和一个 4 篇的小批量作业，
+对比 FIFO 等待队列与作业级公平调度（小批量作业按文档数获得更高权重）下各作业的完成时间
+
+运行：python -m bench.bench_scheduler
+'''
+import sys
+import time
+import random
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from collections import deque
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.genText as gt
+import core.limiter as lm
+from core.mock_llm import MockServer, MockConfig
+from core.scheduler import job_for, set_job, finish_job
+
+BATCH_DOCS = 50
+SMALL_BATCH_DOCS = 4
+CHUNKS_PER_DOC = 8
+WINDOW = 8
+LATENCY = 0.2
+INTERACTIVE_DELAY = 1.0  # 批量作业开始后多久提交单文档作业
+
+
+async def run_job(doc_count, name):
+    job = job_for(doc_count, name)
+    token = set_job(job)
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*[gt.genText(f'{name}-{random.random()}', bypass_cache=True, hedge=False)
+                               for _ in range(doc_count * CHUNKS_PER_DOC)])
+    finally:
+        await gt.close_session()
+        finish_job(job, token)
+    return time.perf_counter() - start
+
+
+def run(fair):
+    limiter = lm.AdaptiveLimiter(initial=WINDOW, max_window=WINDOW)
+    if not fair:
+        limiter._waiters = deque()
+    gt.PROVIDERS['ark'].limiter = limiter
+    elapsed = {}
+
+    def worker(doc_count, name, delay):
+        time.sleep(delay)
+        elapsed[name] = asyncio.run(run_job(doc_count, name))
+
+    threads = [threading.Thread(target=worker, args=(BATCH_DOCS, 'batch', 0)),
+               threading.Thread(target=worker, args=(1, 'interactive', INTERACTIVE_DELAY)),
+               threading.Thread(target=worker, args=(SMALL_BATCH_DOCS, 'small', INTERACTIVE_DELAY))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return elapsed
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    for fair in (False, True):
+        with MockServer(MockConfig(latency=LATENCY)) as server:
+            gt.PROVIDERS['ark'].url = server.url
+            elapsed = run(fair)
+        print(f'[fair={fair!s:<5}] interactive job ({CHUNKS_PER_DOC} chunks) = {elapsed["interactive"]:.2f}s, '
+              f'small batch job ({SMALL_BATCH_DOCS * CHUNKS_PER_DOC} chunks) = {elapsed["small"]:.2f}s, '
+              f'batch job ({BATCH_DOCS * CHUNKS_PER_DOC} chunks) = {elapsed["batch"]:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+'''
+@Project ：code 
+@File    ：bench_stream.py
+@Author  ：Sito
+@Date    ：2025/3/14 14:10 
+@Description    ：在本地 SSE 模拟服务上对比非流式与流式（JSON 闭合即返回）的单次调用耗时
+
+运行：python -m bench.bench_stream
+'''
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.genText as gt
+import core.limiter as lm
+from core.mock_llm import MockServer, MockConfig
+
+CALLS = 20
+CONTENT = '```json\n' + json.dumps({"A. 年轻人生活状态探讨": {"1、受访者": {"城市": "成都", "受访者": "胡梦莎"}},
+                                     "B. 波轮洗衣机购买全链路还原": {"12、购买过程": {"外观": "外观不在意，不拿来选美"}}},
+                                    ensure_ascii=False, indent=4) + '\n```'
+TRAILING = '\n\n说明：以上内容根据访谈表格提取，' + '其中未提及的标签没有输出。' * 20
+
+
+async def run(stream):
+    results = []
+    start = time.perf_counter()
+    try:
+        for _ in range(CALLS):
+            results.append(await gt.genText(f'prompt-{random.random()}', bypass_cache=True, stream=stream))
+    finally:
+        await gt.close_session()
+    return (time.perf_counter() - start) / CALLS, results
+
+
+def main():
+    gt.logger.setLevel(logging.CRITICAL)
+    lm.logger.setLevel(logging.CRITICAL)
+    for stream in (False, True):
+        config = MockConfig(latency=0.3, content=CONTENT, token_delay=0.005, trailing_text=TRAILING)
+        with MockServer(config) as server:
+            gt.PROVIDERS['ark'].url = server.url
+            per_call, results = asyncio.run(run(stream))
+        valid = sum(1 for r in results if r != '{}')
+        print(f'[stream={stream}] {per_call:.2f}s per call, valid = {valid}/{CALLS}, '
+              f'http requests = {config.requests}, early disconnects = {config.disconnects}')
+        if stream:
+            print('  ', gt.stream_stats())
+
+
+if __name__ == '__main__':
+    main()
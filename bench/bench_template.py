@@ -0,0 +1,93 @@
+'''
+@Project ：code
+@File    ：bench_template.py
+@Author  ：Sito
+@Date    ：2025/3/30 11:00
+@Description    ：从一批样例文档中学习模板，对比去掉模板行与段落前后每个文档的 token 数与分块数
+
+- 样例：data/input/docx 下的笔录
+- 构造：在每份样例末尾加上同一份访谈须知（段落）与项目信息表，模拟套用完整问卷骨架的笔录
+
+运行：python -m bench.bench_template [--rows]
+'''
+import os
+import sys
+import glob
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx import Document
+from core.chunker import iter_chunks, estimate_tokens, format_row
+from core.docx_stream import iter_docx_blocks
+from core.template import Template, block_signatures, row_signature
+
+
+NOTICE = [
+    '访谈须知：本次访谈内容仅用于产品研究，受访者信息将严格保密，不会用于任何商业推广。',
+    '访谈员应按问卷顺序提问，不得诱导受访者作答；受访者未回答的问题请在对应单元格中填写“未回答”。',
+    '访谈结束后请在 24 小时内整理笔录，并连同录音文件一并上传至项目共享目录。',
+]
+PROJECT_INFO = [
+    ['项目', '内容'],
+    ['项目名称', '家用洗衣机使用习惯研究'],
+    ['访谈方式', '入户面访，单次 90 分钟'],
+    ['甄别条件', '近一年内购买过洗衣机，且为家中洗衣的主要负责人'],
+    ['执行城市', '北京、上海、广州、成都'],
+]
+
+
+def build_templated_docx(sample, path):
+    doc = Document(sample)
+    for text in NOTICE:
+        doc.add_paragraph(text)
+    table = doc.add_table(rows=len(PROJECT_INFO), cols=2)
+    for i, row in enumerate(PROJECT_INFO):
+        for j, text in enumerate(row):
+            table.cell(i, j).text = text
+    doc.save(path)
+
+
+def document_tokens(path, template=None):
+    blocks = iter_docx_blocks(path)
+    if template is not None:
+        blocks = template.filter_blocks(blocks)
+    chunks = list(iter_chunks(blocks))
+    return sum(estimate_tokens(chunk) for chunk in chunks), len(chunks)
+
+
+def report(name, paths, show_rows):
+    template = Template.learn([block_signatures(iter_docx_blocks(path)) for path in paths])
+    print(f'{name}: {template.to_dict()}')
+    print(f"{'document':>14} {'before':>8} {'after':>8} {'saved':>7} {'chunks':>7}")
+    for path in paths:
+        before, before_chunks = document_tokens(path)
+        after, after_chunks = document_tokens(path, template)
+        print(f'{os.path.basename(path):>14} {before:>8} {after:>8} {1 - after / before:>7.1%} '
+              f'{before_chunks:>3}->{after_chunks:<3}')
+    if show_rows:
+        rows = {}
+        for kind, content in iter_docx_blocks(paths[0]):
+            for row in (content[1:] if kind == 'table' else []):
+                if row_signature(row) in template.signatures:
+                    rows.setdefault(format_row(row), None)
+        for row in rows:
+            print(f'  - {row.rstrip()}')
+
+
+def main():
+    show_rows = '--rows' in sys.argv
+    samples = sorted(glob.glob('data/input/docx/*.docx'))
+    report('samples', samples, show_rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        templated = []
+        for sample in samples:
+            path = os.path.join(tmp, os.path.basename(sample))
+            build_templated_docx(sample, path)
+            templated.append(path)
+        report('samples + notice', templated, show_rows)
+
+
+if __name__ == '__main__':
+    main()
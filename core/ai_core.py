@@ -9,16 +9,77 @@ import copy
 import glob
 import json
 import os
+import time
 import asyncio
+import threading
 import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from core.config import *
 from docx import Document
-from core.genText import genText
+from docx.table import Table, _Cell
+from docx.text.paragraph import Paragraph
+from docx.oxml.ns import qn
+from core.chunker import iter_chunks, estimate_tokens
+from core.docx_stream import iter_docx_blocks, table_rows
+from core.genText import genText, close_session, provider_stats, json_stats, dedup_stats, backend_ids
+from core.llm_json import conform_to_schema
+from core.scheduler import set_job, finish_job, job_for
+from core.checkpoint import ChunkJournal, file_digest, text_digest
+from core.template import Template, block_signatures
+from core.llm_cache import get_cache
+from core.doc_cache import get_doc_cache, get_cut_set, doc_key, doc_cache_stats
 from core.prompt_manager import *
 from tqdm.asyncio import tqdm_asyncio
 
 
+def docx_paths(file_path=None, file_paths=None, input_dir='data/input/docx'):
+    """确定要处理的文档列表，参数含义同 extract_word_tables"""
+    if file_paths and isinstance(file_paths, list):
+        return file_paths
+    if file_path:
+        return [file_path]
+    return glob.glob(f'{input_dir}/*.docx')
+
+
+def document_blocks(doc_path):
+    """按文档顺序读取一个文档的表格（及表格之间的正文）"""
+    if DOCX_EXTRACTOR == 'stream':
+        return iter_docx_blocks(doc_path, MERGED_CELLS, DOCX_PARAGRAPHS)
+    return read_docx_blocks(doc_path, MERGED_CELLS, DOCX_PARAGRAPHS)
+
+
+def extract_document(doc_path, template=None, saved=None):
+    """
+    读取一个文档并按 token 预算分块，读到哪里切到哪里
+
+    Args:
+        doc_path: 文档路径
+        template: template.Template，给出时先去掉模板行与段落
+        saved: 传入字典时累计去掉的模板内容，见 Template.filter_blocks；分块生成完后才完整
+
+    Returns:
+        分块内容的生成器
+    """
+    blocks = document_blocks(doc_path)
+    if template is not None:
+        blocks = template.filter_blocks(blocks, saved)
+    # 按 token 预算以行为边界打包，沿用之前处理时记下的切分点
+    return iter_chunks(blocks, cuts=get_cut_set(cut_settings()))
+
+
+def parse_document(doc_path, template=None):
+    """解析进程池中执行：返回一个文档的全部分块与去掉的模板内容"""
+    saved = {}
+    return list(extract_document(doc_path, template, saved)), saved
+
+
+def document_signatures(doc_path):
+    """解析进程池中执行：一个文档的行与段落签名，见 template.block_signatures"""
+    return sorted(block_signatures(document_blocks(doc_path)))
+
+
 def extract_word_tables(file_path=None, file_paths=None, input_dir='data/input/docx'):
     """
     从Word文档中提取表格内容
@@ -32,39 +93,203 @@ def extract_word_tables(file_path=None, file_paths=None, input_dir='data/input/d
         包含(文档路径, 表格内容)元组的列表
     """
     result = []
-    
-    # 确定要处理的文档列表
-    if file_paths and isinstance(file_paths, list):
-        docxs = file_paths
-    elif file_path:
-        docxs = [file_path]
-    else:
-        docxs = glob.glob(f'{input_dir}/*.docx')
-    
-    # 处理每个文档
-    for doc_path in docxs:
-        doc = Document(doc_path)
-        all_tables = []
-
-        # 遍历所有表格
-        for table in doc.tables:
-            table_data = []
-            for row in table.rows:
-                row_data = [cell.text.strip() for cell in row.cells]
-                table_data.append(row_data)
-            all_tables.append(table_data)
-
-        # 写入 result
-        for idx, table in enumerate(all_tables):
-            tmp_text = f"Table {idx + 1}:\n"
-            for row in table:
-                tmp_text += '\t|\t'.join(row).replace('\n', '') + '\n'
-            tmp_text += '\n' + '=' * 50 + '\n'
-            for i in range(0, len(tmp_text), CHUNK_SIZE):
-                tmp_text_part = tmp_text[i:i + CHUNK_SIZE]
-                result.append((doc_path, tmp_text_part))
-    
+    for doc_path in docx_paths(file_path, file_paths, input_dir):
+        for chunk in extract_document(doc_path):
+            result.append((doc_path, chunk))
     return result
+
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """进程内共享的解析进程池，首次使用时创建"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn：app.py 在多线程中调用 process_docx，fork 带锁的进程不安全
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _parse_pool
+
+
+def block_settings():
+    """影响表格与段落读取结果的配置"""
+    return {'merged': MERGED_CELLS, 'paragraphs': DOCX_PARAGRAPHS}
+
+
+def cut_settings():
+    """影响切分点的配置，作为切分点缓存键的一部分"""
+    return {**block_settings(), 'budget': CHUNK_TOKEN_BUDGET}
+
+
+def chunk_settings(template=None):
+    """影响分块结果的配置，作为分块缓存键的一部分"""
+    return {**cut_settings(), 'reuse_cuts': CHUNK_REUSE_CUTS,
+            'template': template.digest if template is not None else None}
+
+
+async def learn_template(docxs, digests):
+    """
+    从本次的一批文档中识别模板行与段落
+
+    每个文档的签名按内容哈希缓存，重复上传时不必再次解析
+
+    Returns:
+        template.Template，关闭或文档数不足时返回 None
+    """
+    if not TEMPLATE_SUPPRESSION_ENABLED or len(docxs) < TEMPLATE_MIN_DOCS:
+        return None
+    cache = get_doc_cache('chunks')
+    keys = [doc_key(digest, {'signatures': block_settings()}) for digest in digests]
+    signatures = [None] * len(docxs)
+    if cache is not None and not DOC_CACHE_BYPASS:
+        for idx, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is not None:
+                signatures[idx] = json.loads(cached)
+    todo = [idx for idx in range(len(docxs)) if signatures[idx] is None]
+    if PARSE_WORKERS > 1 and len(todo) >= PARSE_POOL_MIN_DOCS:
+        loop = asyncio.get_running_loop()
+        pool = get_parse_pool()
+        parsed = await asyncio.gather(*[loop.run_in_executor(pool, document_signatures, docxs[idx]) for idx in todo])
+    else:
+        parsed = [document_signatures(docxs[idx]) for idx in todo]
+    for idx, result in zip(todo, parsed):
+        signatures[idx] = result
+        if cache is not None:
+            cache.set(keys[idx], json.dumps(result))
+    return Template.learn(signatures)
+
+
+def llm_settings(pack):
+    """影响单个分块 AI 结果的配置，作为分块结果缓存键的一部分"""
+    return {
+        'prompt': text_digest(EXTRACT_PROMPT_PREFIX),
+        'routing': SECTION_ROUTING_ENABLED,
+        'pack': PACK_TOKEN_BUDGET if pack else None,
+        'cascade': [CASCADE_TIERS, CASCADE_THRESHOLD] if CASCADE_ENABLED else None,
+        'backends': backend_ids(),
+        'temperature': LLM_TEMPERATURE
+    }
+
+
+def result_settings(pack, template=None):
+    """影响单文档 AI 结果的配置，作为结果缓存键的一部分"""
+    return {'chunks': chunk_settings(template), **llm_settings(pack)}
+
+
+async def iter_documents(docxs, digests=None, template=None):
+    """
+    解析文档，按解析完成的先后生成结果
+
+    给出 digests 时先查分块缓存，命中的文档不再解析，新解析的分块与去掉的模板内容写入缓存。
+    文档数达到 PARSE_POOL_MIN_DOCS 时在进程池中并行解析；否则在当前线程中逐个解析，
+    分块按需生成，调用方每取一个分块才继续解析，解析与请求交替进行
+
+    Args:
+        docxs: 文档路径列表
+        digests: 与 docxs 对应的文档内容哈希
+        template: template.Template，去掉模板行与段落
+
+    Yields:
+        (文档序号, 文档路径, 分块内容的可迭代对象, 去掉的模板内容)，调用方需在取下一个文档前读完当前文档的分块；
+        去掉的模板内容是 Template.filter_blocks 的 saved 字典，读完分块后才完整
+    """
+    cache = get_doc_cache('chunks') if digests else None
+    keys = [doc_key(digest, chunk_settings(template)) for digest in digests] if cache else None
+    todo = []
+    for idx, doc_path in enumerate(docxs):
+        cached = cache.get(keys[idx]) if cache and not DOC_CACHE_BYPASS else None
+        if cached is not None:
+            cached = json.loads(cached)
+            yield idx, doc_path, cached['chunks'], cached['saved']
+        else:
+            todo.append(idx)
+
+    def stored(idx, chunks, saved):
+        """边生成边记录，读完后写入分块缓存"""
+        produced = []
+        for chunk in chunks:
+            produced.append(chunk)
+            yield chunk
+        if cache:
+            cache.set(keys[idx], json.dumps({'chunks': produced, 'saved': saved}, ensure_ascii=False))
+
+    if PARSE_WORKERS <= 1 or len(todo) < PARSE_POOL_MIN_DOCS:
+        for idx in todo:
+            saved = {}
+            yield idx, docxs[idx], stored(idx, extract_document(docxs[idx], template, saved), saved), saved
+        return
+
+    loop = asyncio.get_running_loop()
+    pool = get_parse_pool()
+
+    async def parse(idx):
+        return idx, await loop.run_in_executor(pool, parse_document, docxs[idx], template)
+
+    tasks = [asyncio.ensure_future(parse(idx)) for idx in todo]
+    try:
+        for done in asyncio.as_completed(tasks):
+            idx, (chunks, saved) = await done
+            yield idx, docxs[idx], stored(idx, chunks, saved), saved
+    finally:
+        # 中途出错时取消尚未开始的解析
+        for task in tasks:
+            task.cancel()
+
+
+def docx_table_rows(table, merged=MERGED_CELLS):
+    """
+    python-docx 的表格转行列表
+
+    Args:
+        table: docx.table.Table
+        merged: 合并单元格的输出方式，见 docx_stream.table_rows
+
+    Returns:
+        行列表，每行是单元格文本列表
+    """
+    if merged == 'span':
+        # row.cells 对合并单元格返回同一个对象多次，这里按 w:tc 逐个读取
+        return table_rows(table._tbl, merged, text=lambda tc: _Cell(tc, table).text)
+    table_data = []
+    for row in table.rows:
+        row_data = [cell.text.strip() for cell in row.cells]
+        table_data.append(row_data)
+    return table_data
+
+
+def read_docx_tables(doc_path, merged=MERGED_CELLS):
+    """
+    用 python-docx 读取文档中的所有表格
+
+    Args:
+        doc_path: 文档路径
+        merged: 合并单元格的输出方式，见 docx_stream.table_rows
+
+    Returns:
+        表格列表，每个表格是行的列表，每行是单元格文本列表
+    """
+    return [docx_table_rows(table, merged) for table in Document(doc_path).tables]
+
+
+def read_docx_blocks(doc_path, merged=MERGED_CELLS, paragraphs=True):
+    """
+    用 python-docx 按文档顺序读取段落与表格，输出同 docx_stream.iter_docx_blocks
+
+    Yields:
+        ('table', 行列表) 或 ('paragraph', 段落文本)
+    """
+    doc = Document(doc_path)
+    # 逐个读取 body 的子元素（python-docx 0.8.11 没有 iter_inner_content）
+    for element in doc.element.body.iterchildren():
+        if element.tag == qn('w:tbl'):
+            yield 'table', docx_table_rows(Table(element, doc._body), merged)
+        elif element.tag == qn('w:p') and paragraphs:
+            yield 'paragraph', Paragraph(element, doc._body).text
+
+
 async def process(doc_path, text):
     """
     处理文档内容，调用AI生成结构化数据
@@ -76,13 +301,144 @@ async def process(doc_path, text):
     Returns:
         (文档路径, 处理结果)元组
     """
-    query = get_extract_prompt(text)
+    sections = route_sections(text) if SECTION_ROUTING_ENABLED else None
+    query = get_extract_prompt(text, sections)
+    if CASCADE_ENABLED:
+        return doc_path, await cascade(query, sections)
     j = await genText(query)
     try:
         j = json.loads(j)
     except:
         print(f'[process] parse json fail, json : {j}, error : {traceback.format_exc()}')
-    return doc_path, j
+        return doc_path, {}
+    return doc_path, conform(j)
+
+
+def conform(j):
+    """按 level_label 校验模型输出，丢弃不存在的路径，避免 postprocess 中途失败"""
+    j, dropped = conform_to_schema(j, level_label)
+    if dropped:
+        print(f'[conform] dropped {dropped} fields not in level_label')
+    return j
+
+
+def score_result(j, dropped, sections=None):
+    """
+    本地评估一个分块的抽取结果，级联模式据此决定是否交给下一级模型
+
+    Args:
+        j: conform_to_schema 规整后的结果
+        dropped: 规整时丢弃的字段数
+        sections: 该分块路由到的一级标签，None 表示全部
+
+    Returns:
+        0~1 的得分：结构有效比例 × 非否定词比例 ×（0.5 + 0.5 × 路由标签覆盖度）；没有填写任何字段时为 0
+    """
+    values = [v for second in j.values() for third in second.values() for v in third.values() if v]
+    if not values:
+        return 0.0
+    validity = len(values) / (len(values) + dropped)
+    expected = [section for section in (sections or SECTIONS) if section not in ALWAYS_SECTIONS]
+    covered = [section for section in expected
+               if any(v for third in j.get(section, {}).values() for v in third.values())]
+    coverage = len(covered) / len(expected) if expected else 1.0
+    deny_ratio = sum(1 for v in values if v in deny_words) / len(values)
+    return validity * (1 - deny_ratio) * (0.5 + 0.5 * coverage)
+
+
+# 级联模式每一级的请求数、采纳的分块数与累计耗时
+cascade_outcomes = [{'calls': 0, 'accepted': 0, 'latency': 0.0} for _ in CASCADE_TIERS]
+
+
+def cascade_stats():
+    """各级端点的请求数、采纳的分块数与平均耗时"""
+    return [{
+        'tier': tier,
+        'endpoints': CASCADE_TIERS[tier],
+        'calls': outcome['calls'],
+        'accepted': outcome['accepted'],
+        'avg_latency': round(outcome['latency'] / outcome['calls'], 4) if outcome['calls'] else None
+    } for tier, outcome in enumerate(cascade_outcomes)]
+
+
+async def cascade(query, sections=None, start_tier=0):
+    """
+    级联抽取：从 start_tier 开始逐级调用，得分达到 CASCADE_THRESHOLD 即采纳
+
+    Returns:
+        得分最高的一级结果
+    """
+    best, best_score = {}, -1.0
+    for tier in range(start_tier, len(CASCADE_TIERS)):
+        start = time.monotonic()
+        raw = await genText(query, names=CASCADE_TIERS[tier])
+        cascade_outcomes[tier]['calls'] += 1
+        cascade_outcomes[tier]['latency'] += time.monotonic() - start
+        try:
+            raw = json.loads(raw)
+        except:
+            print(f'[cascade] parse json fail, json : {raw}, error : {traceback.format_exc()}')
+            raw = {}
+        j, dropped = conform_to_schema(raw, level_label)
+        score = score_result(j, dropped, sections)
+        if score > best_score:
+            best, best_score = j, score
+        if score >= CASCADE_THRESHOLD:
+            cascade_outcomes[tier]['accepted'] += 1
+            break
+        if tier + 1 < len(CASCADE_TIERS):
+            print(f'[cascade] tier {tier} score {score:.2f} < {CASCADE_THRESHOLD}, escalate')
+    return best
+
+
+async def process_packed(doc_path, texts):
+    """
+    一次请求处理同一文档的多个分块，并把结果拆回每个分块
+
+    Args:
+        doc_path: 文档路径
+        texts: 分块内容列表
+
+    Returns:
+        (每个分块的(文档路径, 处理结果)元组列表, 结果是否按分块拆分)；
+        模型没有按分块输出时整组结果记在第一个分块上，不能当作单个分块的结果保存
+    """
+    if len(texts) == 1:
+        return [await process(doc_path, texts[0])], True
+    sections = None
+    if SECTION_ROUTING_ENABLED:
+        picked = set()
+        for text in texts:
+            picked.update(route_sections(text))
+        sections = [section for section in SECTIONS if section in picked]
+    query = get_packed_extract_prompt(texts, sections)
+    start = time.monotonic()
+    j = await genText(query, names=CASCADE_TIERS[0] if CASCADE_ENABLED else None)
+    if CASCADE_ENABLED:
+        cascade_outcomes[0]['calls'] += 1
+        cascade_outcomes[0]['latency'] += time.monotonic() - start
+    try:
+        j = json.loads(j)
+    except:
+        print(f'[process_packed] parse json fail, json : {j}, error : {traceback.format_exc()}')
+        return [(doc_path, {}) for _ in texts], True
+    keys = [packed_key(k) for k in range(1, len(texts) + 1)]
+    if not any(key in j for key in keys):
+        # 模型没有按分块输出，整体记在第一个分块上，按文档合并时不受影响；调用方不按分块保存
+        return [(doc_path, conform(j))] + [(doc_path, {}) for _ in texts[1:]], False
+    if CASCADE_ENABLED:
+        return await asyncio.gather(*[escalate_packed(doc_path, text, j.get(key) or {}) for text, key in zip(texts, keys)]), True
+    return [(doc_path, conform(j.get(key) or {})) for key in keys], True
+
+
+async def escalate_packed(doc_path, text, raw):
+    """级联模式下评估合并请求中一个分块的结果，得分不足时单独交给下一级端点"""
+    sections = route_sections(text) if SECTION_ROUTING_ENABLED else None
+    j, dropped = conform_to_schema(raw, level_label)
+    if score_result(j, dropped, sections) >= CASCADE_THRESHOLD or len(CASCADE_TIERS) == 1:
+        cascade_outcomes[0]['accepted'] += 1
+        return doc_path, j
+    return doc_path, await cascade(get_extract_prompt(text, sections), sections, start_tier=1)
 
 
 def postprocess(results, doc_path, j):
@@ -109,7 +465,7 @@ def postprocess(results, doc_path, j):
         print(f'[postprocess] fail, json : {j}, error : {traceback.format_exc()}')
 
 
-async def process_docx(file_path=None, file_paths=None, input_dir='data/input/docx', output_dir='data/input/json/temp', output_filename='ai_json.json'):
+async def process_docx(file_path=None, file_paths=None, input_dir='data/input/docx', output_dir='data/input/json/temp', output_filename='ai_json.json', pack=PACK_CHUNKS_ENABLED, job=None, resume=CHECKPOINT_RESUME, on_document=None):
     """
     处理Word文档并生成结构化JSON数据
     
@@ -119,27 +475,200 @@ async def process_docx(file_path=None, file_paths=None, input_dir='data/input/do
         input_dir: 文档目录，当file_path和file_paths都为None时使用
         output_dir: 输出目录
         output_filename: 输出文件名
+        pack: 是否把同一文档的小分块合并进一次请求
+        job: scheduler.Job，本次调用的 LLM 请求按该作业排队；为 None 时按文档数创建
+        resume: 为 True 时复用检查点日志中已完成的分块，只请求缺失的分块
+        on_document: 回调 (文档序号, 文档路径, 单文档结果)，每个文档的分块全部完成并合并后立即调用，
+            按完成先后而非文档顺序；没有任何分块结果的文档不回调
         
     Returns:
         处理结果字典
     """
     # 确保输出目录存在
     Path(output_dir).mkdir(parents=True, exist_ok=True)
-    
-    # 提取表格内容
-    info = extract_word_tables(file_path, file_paths, input_dir)
-    
-    # 处理每个表格内容
-    process_task = [process(doc_path, txt) for (doc_path, txt) in info]
-    llm_result = await tqdm_asyncio.gather(*process_task)
+    docxs = docx_paths(file_path, file_paths, input_dir)
+    digests = [file_digest(doc_path) for doc_path in docxs]
+    # 一批文档共有的模板内容不进入提示词（开启时需先解析全部文档，见 TEMPLATE_SUPPRESSION_ENABLED）
+    template = await learn_template(docxs, digests)
+    if template is not None:
+        print(f'[process_docx] template : {template.to_dict()}')
+
+    # 文档级结果缓存：重复上传的文档直接复用合并后的结果，不再解析和请求
+    result_cache = get_doc_cache('results')
+    result_keys = [doc_key(digest, result_settings(pack, template)) for digest in digests]
+    cached_results = [None] * len(docxs)
+    if result_cache is not None and not DOC_CACHE_BYPASS:
+        for idx, key in enumerate(result_keys):
+            cached = result_cache.get(key)
+            if cached is not None:
+                cached_results[idx] = json.loads(cached)
+    remaining = [idx for idx in range(len(docxs)) if cached_results[idx] is None]
+    if on_document:
+        for idx, result in enumerate(cached_results):
+            if result is not None:
+                on_document(idx, docxs[idx], result)
+
+    # 分块检查点：每个分块完成即写入日志，resume 时已完成的分块直接复用
+    journal = None
+    if CHECKPOINT_ENABLED:
+        journal = ChunkJournal(os.path.join(output_dir, output_filename + '.journal.jsonl'), resume=resume)
+    # 每个文档的 (文档路径, 结果) 列表，文档的分块全部完成后按分块顺序合并
+    llm_results = [[] for _ in docxs]
+    merged = list(cached_results)
+    pending = [0] * len(docxs)
+    produced = [False] * len(docxs)
+    # 每个文档去掉的模板内容（结果缓存命中的文档不解析，不计入）
+    template_saved = {}
+    progress = tqdm_asyncio(total=0)
+
+    # 分块结果缓存：键为分块内容，修订后的文档中未变化的分块不再请求
+    chunk_cache = get_doc_cache('chunk_results')
+    chunk_llm_settings = llm_settings(pack)
+    reused = 0
+    requested = 0
 
-    # 整合结果
-    results = {}
     format = copy.deepcopy(level_label)
-    for (doc_path, j) in llm_result:
-        if doc_path not in results: 
-            results[doc_path] = copy.deepcopy(format)
-        postprocess(results, doc_path, j)
+
+    def finish(idx):
+        """合并一个文档的分块结果，写入结果缓存并回调"""
+        doc_path = docxs[idx]
+        results = {}
+        for (_, j) in llm_results[idx]:
+            if doc_path not in results:
+                results[doc_path] = copy.deepcopy(format)
+            postprocess(results, doc_path, j)
+        merged[idx] = results.get(doc_path)
+        if merged[idx] is None:
+            return
+        # 只缓存每个分块都有结果的文档，避免把解析失败的空结果当成最终结果复用
+        if result_cache is not None and all(j for _, j in llm_results[idx]):
+            result_cache.set(result_keys[idx], json.dumps(merged[idx], ensure_ascii=False))
+        if on_document:
+            on_document(idx, doc_path, merged[idx])
+
+    def checkpoint(idx, pos, doc_path, key, j, persist=True):
+        llm_results[idx][pos] = (doc_path, j)
+        # 空结果（解析失败、所有端点失败或熔断）不记入日志，resume 时重新请求
+        if journal and j and persist:
+            journal.record(doc_path, *key, j)
+        if chunk_cache is not None and j and persist:
+            chunk_cache.set(doc_key(key[2], chunk_llm_settings), json.dumps(j, ensure_ascii=False))
+        pending[idx] -= 1
+        if produced[idx] and not pending[idx]:
+            finish(idx)
+
+    def reuse(key):
+        """日志或分块结果缓存中已有的结果，没有时返回 None"""
+        restored = journal.get(*key) if journal else None
+        if restored is None and chunk_cache is not None and not DOC_CACHE_BYPASS:
+            cached = chunk_cache.get(doc_key(key[2], chunk_llm_settings))
+            restored = json.loads(cached) if cached is not None else None
+        return restored
+
+    async def run_chunk(idx, pos, doc_path, text, key):
+        _, j = await process(doc_path, text)
+        checkpoint(idx, pos, doc_path, key, j)
+
+    async def run_group(idx, doc_path, items):
+        group, split = await process_packed(doc_path, [text for _, text, _ in items])
+        # 未按分块拆分的整组结果只参与本次合并，不写入日志与分块结果缓存，续跑或重新提交时整组重新请求
+        for (pos, _, key), (_, j) in zip(items, group):
+            checkpoint(idx, pos, doc_path, key, j, persist=split)
+
+    # 生产者按需解析出分块放入有界队列，PIPELINE_WORKERS 个消费者取出即请求；队列满时解析暂停
+    queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    async def submit(run, *args):
+        nonlocal requested
+        requested += 1
+        progress.total += 1
+        progress.refresh()
+        await queue.put((run, args))
+        # 队列未满时 put 不会让出事件循环，这里让消费者先把请求发出去再继续解析
+        await asyncio.sleep(0)
+
+    async def produce():
+        nonlocal reused
+        async for k, doc_path, chunks, saved in iter_documents([docxs[idx] for idx in remaining],
+                                                               [digests[idx] for idx in remaining], template):
+            idx = remaining[k]
+            slots = llm_results[idx]
+            group, used = [], 0
+            for pos, text in enumerate(chunks):
+                key = (digests[idx], pos, text_digest(text))
+                slots.append(None)
+                restored = reuse(key)
+                if restored is not None:
+                    slots[pos] = (doc_path, restored)
+                    reused += 1
+                elif not pack:
+                    pending[idx] += 1
+                    await submit(run_chunk, idx, pos, doc_path, text, key)
+                else:
+                    # 同一文档相邻的待请求分块合并成组，总 token 不超过预算
+                    tokens = estimate_tokens(text)
+                    if group and used + tokens > PACK_TOKEN_BUDGET:
+                        await submit(run_group, idx, doc_path, group)
+                        group, used = [], 0
+                    pending[idx] += 1
+                    group.append((pos, text, key))
+                    used += tokens
+            if group:
+                await submit(run_group, idx, doc_path, group)
+            produced[idx] = True
+            template_saved[idx] = saved
+            if not pending[idx]:
+                finish(idx)
+        await queue.join()
+
+    async def consume():
+        while True:
+            run, args = await queue.get()
+            try:
+                await run(*args)
+            finally:
+                queue.task_done()
+                progress.update()
+
+    # 本次的 LLM 请求都归入同一作业参与公平调度
+    job = job or job_for(len(docxs))
+    token = set_job(job)
+    consumers = [asyncio.ensure_future(consume()) for _ in range(PIPELINE_WORKERS)]
+    producer = asyncio.ensure_future(produce())
+    try:
+        # 消费者只会因异常结束，此时立即停止
+        await asyncio.wait([producer, *consumers], return_when=asyncio.FIRST_COMPLETED)
+        for task in [producer, *consumers]:
+            if task.done():
+                task.result()
+    finally:
+        for task in [producer, *consumers]:
+            task.cancel()
+        await asyncio.gather(producer, *consumers, return_exceptions=True)
+        progress.close()
+        # 释放本次事件循环的连接池
+        await close_session()
+        finish_job(job, token)
+    if journal and resume:
+        print(f'[process_docx] resume : {journal.restored} chunks restored, {requested} requests processed')
+    print(f'[process_docx] job : {job.to_dict()}')
+    print(f'[process_docx] provider stats : {provider_stats()}')
+    print(f'[process_docx] json stats : {json_stats()}')
+    print(f'[process_docx] dedup stats : {dedup_stats(job)}')
+    if template is not None:
+        documents = {os.path.basename(docxs[idx]): saved for idx, saved in sorted(template_saved.items())}
+        total = sum(saved.get('tokens', 0) for saved in documents.values())
+        print(f'[process_docx] template saved : {total} tokens, per document : {documents}')
+    if CASCADE_ENABLED:
+        print(f'[process_docx] cascade stats : {cascade_stats()}')
+    if get_cache() is not None:
+        print(f'[process_docx] llm cache stats : {get_cache().stats()}')
+    if result_cache is not None:
+        print(f'[process_docx] doc cache : {len(docxs) - len(remaining)}/{len(docxs)} results reused, '
+              f'{reused} chunks reused, stats : {doc_cache_stats()}')
+
+    # 整合结果
+    results = {doc_path: merged[idx] for idx, doc_path in enumerate(docxs) if merged[idx] is not None}
 
     # 保存结果
     output_path = os.path.join(output_dir, output_filename)
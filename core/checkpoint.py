@@ -0,0 +1,93 @@
+'''
+@Project ：code 
+@File    ：checkpoint.py
+@Author  ：Sito
+@Date    ：2025/3/26 10:00 
+@Description    ：process_docx 的分块级检查点
+
+每个分块的结果一返回就追加写入 JSONL 日志，键为 (文档内容哈希, 分块序号)，并记录分块内容哈希。
+resume 时只重新请求日志中缺失或内容已变化的分块，再按原顺序合并。
+'''
+import os
+import json
+import hashlib
+import threading
+from core.config import logger_configuration
+
+logger = logger_configuration('checkpoint')
+
+
+def file_digest(path):
+    """文档内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ChunkJournal:
+    """追加写入的分块结果日志
+
+    属性:
+        path (str): JSONL 文件路径
+        restored (int): resume 时从日志中复用的分块数
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.restored = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+        else:
+            # 新的一次处理，清空旧日志
+            open(path, 'w', encoding='utf-8').close()
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程中断时最后一行可能不完整
+                    continue
+                self._entries[(entry['doc_hash'], entry['chunk'])] = entry
+        logger.info(f"从 {self.path} 读取 {len(self._entries)} 个分块结果")
+
+    def get(self, doc_hash, index, chunk_hash):
+        """
+        查询已完成的分块结果
+
+        Returns:
+            分块结果；不存在、分块内容已变化或结果为空时返回 None
+        """
+        entry = self._entries.get((doc_hash, index))
+        if entry is None or entry['chunk_hash'] != chunk_hash or not entry['result']:
+            return None
+        self.restored += 1
+        return entry['result']
+
+    def record(self, doc_path, doc_hash, index, chunk_hash, result):
+        """追加一条分块结果并立即落盘"""
+        entry = {
+            'doc': doc_path,
+            'doc_hash': doc_hash,
+            'chunk': index,
+            'chunk_hash': chunk_hash,
+            'result': result
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._entries[(doc_hash, index)] = entry
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
@@ -0,0 +1,217 @@
+'''
+@Project ：code 
+@File    ：chunker.py
+@Author  ：Sito
+@Date    ：2025/3/17 10:15 
+@Description    ：按 token 预算、以表格行为边界切分文档内容
+
+小表格整表打包进同一分块；超过预算的大表格按行切分，每个分片重复表头行。
+表格之间的正文段落合并为一段 Text 与表格一起打包，过长时按段落切分。
+给出 cuts 时记住大表格与长正文的切分点（见 cut_key），修订后的文档重新切分时沿用原来的切分点，
+修改某几行只会改变所在的分片，其余分片内容不变；配合按分块内容缓存的结果，修订后重新提交只需重新请求变化的分块。
+第一次切分与贪心切分相同，分块数不增加。
+'''
+import re
+import hashlib
+from functools import partial
+from core.config import CHUNK_TOKEN_BUDGET
+
+TABLE_SEPARATOR = '\n' + '=' * 50 + '\n'
+CELL_SEPARATOR = '\t|\t'
+
+_CJK = re.compile(r'[　-〿一-鿿＀-￯]')
+
+
+def estimate_tokens(text):
+    """
+    粗略估算 token 数：中文字符及全角标点按 1 个计，其余字符按 4 个字符 1 个计
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def format_row(row):
+    """把一行单元格拼成一行文本"""
+    return CELL_SEPARATOR.join(row).replace('\n', '') + '\n'
+
+
+def cut_key(row, next_row):
+    """row 与 next_row 之间的切分点：由相邻两行的内容确定，与所在位置无关"""
+    return hashlib.sha256((format_row(row) + format_row(next_row)).encode('utf-8')).hexdigest()
+
+
+def format_table(idx, rows, title_suffix=''):
+    """按原有格式输出一个表格"""
+    return f"Table {idx}{title_suffix}:\n" + ''.join(format_row(row) for row in rows) + TABLE_SEPARATOR
+
+
+def format_text(idx, paragraphs, title_suffix=''):
+    """正文段落：每段一行，与表格使用同样的分隔"""
+    return f"Text {idx}{title_suffix}:\n" + ''.join(format_row([paragraph]) for paragraph in paragraphs) + TABLE_SEPARATOR
+
+
+def partition_rows(rows, overhead, budget, first_budget=None, cuts=None):
+    """
+    把行按预算分组
+
+    贪心填满预算；给出 cuts 时，一组在超出预算处回退到组内最后一个已知切分点结束（组内没有时仍在超出预算处结束），
+    本次的切分点加入 cuts。修订后的文档沿用原来的切分点：改动所在的组变大放不下时在其中多切一次，
+    之后的组从下一个已知切分点起与原来一致，不会整体后移
+
+    Args:
+        rows: 行列表（单元格文本列表）
+        overhead: 每组固定占用的 token（标题、表头等）
+        budget: 每组的 token 预算
+        first_budget: 第一组的预算，默认同 budget
+        cuts: 已知切分点（cut_key）的集合，支持 in 与 add；None 时为贪心切分
+
+    Returns:
+        行分组列表
+    """
+    limit = budget if first_budget is None else first_budget
+    pieces = []
+    current = []
+    used = overhead
+    known = None  # 当前组内最后一个已知切分点之前的行数
+    pos = 0
+    while pos < len(rows):
+        row = rows[pos]
+        row_tokens = estimate_tokens(format_row(row))
+        if current and used + row_tokens > limit:
+            end = known or len(current)
+            pieces.append(current[:end])
+            # 已知切分点之后的行放回，从下一组重新计算
+            pos -= len(current) - end
+            current = []
+            used = overhead
+            limit = budget
+            known = None
+            continue
+        current.append(row)
+        used += row_tokens
+        if cuts is not None and pos + 1 < len(rows) and cut_key(row, rows[pos + 1]) in cuts:
+            known = len(current)
+        pos += 1
+    if current:
+        pieces.append(current)
+    if cuts is not None:
+        for piece, next_piece in zip(pieces, pieces[1:]):
+            cuts.add(cut_key(piece[-1], next_piece[0]))
+    return pieces
+
+
+def split_table(idx, rows, budget, first_budget=None, cuts=None):
+    """
+    把超出预算的表格按行切分，每个分片重复表头行
+
+    Args:
+        idx: 表格序号（从 1 开始）
+        rows: 表格行（单元格文本列表）
+        budget: 每个分片的 token 预算
+        first_budget: 第一个分片的预算（用于填满当前分块的剩余空间），默认同 budget
+        cuts: 已知切分点，见 partition_rows
+
+    Returns:
+        分片文本列表
+    """
+    header, body = rows[0], rows[1:]
+    overhead = estimate_tokens(format_table(idx, [header], '（续）'))
+    pieces = partition_rows(body, overhead, budget, first_budget, cuts)
+    return [format_table(idx, [header] + piece, '' if n == 0 else '（续）') for n, piece in enumerate(pieces)]
+
+
+def split_text(idx, paragraphs, budget, first_budget=None, cuts=None):
+    """把超出预算的正文按段落切分，参数同 split_table"""
+    overhead = estimate_tokens(format_text(idx, [], '（续）'))
+    pieces = partition_rows([[paragraph] for paragraph in paragraphs], overhead, budget, first_budget, cuts)
+    return [format_text(idx, [row[0] for row in piece], '' if n == 0 else '（续）') for n, piece in enumerate(pieces)]
+
+
+def iter_blocks_text(blocks, budget, cuts):
+    """
+    把文档内容块转成 (文本, 切分函数) 序列，相邻段落合并为一段正文
+
+    切分函数接收第一片的预算，返回分片列表；只有一行的表格或只有一段的正文为 None
+    """
+    table_idx = text_idx = 0
+    paragraphs = []
+
+    def text_unit():
+        nonlocal text_idx
+        text_idx += 1
+        split = partial(split_text, text_idx, paragraphs, budget, cuts=cuts)
+        return format_text(text_idx, paragraphs), split if len(paragraphs) > 1 else None
+
+    for kind, content in blocks:
+        if kind == 'paragraph':
+            if content.strip():
+                paragraphs.append(content.strip())
+            continue
+        if paragraphs:
+            yield text_unit()
+            paragraphs = []
+        table_idx += 1
+        if not content:
+            continue
+        split = partial(split_table, table_idx, content, budget, cuts=cuts)
+        yield format_table(table_idx, content), split if len(content) > 1 else None
+    if paragraphs:
+        yield text_unit()
+
+
+def iter_chunks(blocks, budget=CHUNK_TOKEN_BUDGET, cuts=None):
+    """
+    按文档顺序逐个生成不超过 token 预算的分块，读到哪里切到哪里
+
+    Args:
+        blocks: ('table', 行列表) 或 ('paragraph', 段落文本) 的序列，可以是生成器
+        budget: 每个分块的 token 预算
+        cuts: 大表格与长正文的已知切分点，见 partition_rows
+
+    Yields:
+        分块文本
+    """
+    current = ''
+    used = 0
+    for text, split in iter_blocks_text(blocks, budget, cuts):
+        tokens = estimate_tokens(text)
+        if tokens > budget and split is not None:
+            # 大表格按行切分：第一片填满当前分块剩余空间，最后一片留给后续小表格继续打包
+            if budget - used < budget // 10 and current:
+                yield current
+                current, used = '', 0
+            pieces = split(first_budget=budget - used)
+            for piece in pieces[:-1]:
+                yield current + piece
+                current = ''
+            current = pieces[-1]
+            used = estimate_tokens(current)
+            continue
+        if used + tokens > budget and current:
+            yield current
+            current, used = '', 0
+        current += text
+        used += tokens
+    if current:
+        yield current
+
+
+def chunk_tables(tables, budget=CHUNK_TOKEN_BUDGET, cuts=None):
+    """
+    把一个文档的所有表格打包成不超过 token 预算的分块
+
+    Args:
+        tables: 表格列表，每个表格是行的列表，每行是单元格文本列表
+        budget: 每个分块的 token 预算
+        cuts: 大表格的已知切分点，见 partition_rows
+
+    Returns:
+        分块文本列表
+    """
+    return list(iter_chunks((('table', rows) for rows in tables), budget, cuts))
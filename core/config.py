@@ -9,7 +9,124 @@ import os
 import sys
 import logging
 
-CHUNK_SIZE = 10000
+CHUNK_TOKEN_BUDGET = 10000  # 每个分块的 token 预算（不含提示词模板）
+CHUNK_REUSE_CUTS = True  # 记住大表格的切分点，修订后的文档沿用，只有改动所在的分块变化；首次处理的分块数不变
+DOCX_EXTRACTOR = os.environ.get('DOCX_EXTRACTOR', 'stream')  # stream：iterparse 流式读取；python-docx：原实现
+MERGED_CELLS = os.environ.get('MERGED_CELLS', 'span')  # span：合并单元格只输出一次并标注跨度；repeat：按 python-docx 的方式重复
+DOCX_PARAGRAPHS = True  # 同时提取表格之间的正文段落
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', os.cpu_count() or 1))  # 解析 docx 的进程数，1 表示在事件循环线程中逐个解析
+PARSE_POOL_MIN_DOCS = 2  # 一次处理的文档数达到该值才使用解析进程池
+PIPELINE_WORKERS = 128  # 消费分块队列、发起 LLM 请求的协程数，不小于各服务商并发上限之和
+PIPELINE_QUEUE_SIZE = 256  # 待请求分块队列的上限，满时暂停解析
+TEMPLATE_SUPPRESSION_ENABLED = False  # 一次处理多份文档时，去掉大多数文档共有的模板行与段落；需在第一个请求前多解析一遍全部文档，默认关闭
+TEMPLATE_MIN_DOCS = 3  # 文档数达到该值才识别模板
+TEMPLATE_MIN_DOC_RATIO = 0.8  # 在至少这一比例的文档中完全相同的行或段落视为模板
+RENDER_PIPELINE_ENABLED = True  # 每个文档提取完成即渲染其 Excel 列与 PPT 页，不等全部文档
+SECTION_ROUTING_ENABLED = True  # 每个分块只携带可能相关的一级标签
+PACK_CHUNKS_ENABLED = False  # 把同一文档的多个小分块合并进一次请求
+PACK_TOKEN_BUDGET = 10000  # 合并请求的分块总 token 上限
+CHECKPOINT_ENABLED = True  # 每个分块的结果返回后立即写入输出目录下的 JSONL 日志，供 resume 使用
+CHECKPOINT_RESUME = os.environ.get('RESUME', '0') == '1'  # process_docx 默认是否从日志续跑
+
+# 级联模式：每个分块先用第一级（快）端点抽取，本地打分低于阈值的分块再交给下一级（强）端点
+CASCADE_ENABLED = os.environ.get('LLM_CASCADE', '0') == '1'
+CASCADE_TIERS = [
+    ['ep-20250219164708-nnn2f', 'ep-20250225145337-hkpkn'],  # v3
+    ['ep-20250225145427-8546n']  # r1
+]
+CASCADE_THRESHOLD = 0.5  # 结果得分（0~1）低于该值时升级
+
+# 项目根目录
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# LLM 接口地址，可通过环境变量指向本地 mock 服务
+ARK_API_URL = os.environ.get('ARK_API_URL', 'https://ark.cn-beijing.volces.com/api/v3/chat/completions')
+
+LLM_TEMPERATURE = 0.7
+
+# HTTP 连接池配置（aiohttp）
+HTTP_POOL_SIZE = 100  # 连接池总连接数上限
+HTTP_POOL_PER_HOST = 100  # 单个主机连接数上限
+HTTP_KEEPALIVE_TIMEOUT = 60  # 空闲连接保活时间（秒）
+HTTP_CONNECT_TIMEOUT = 10  # 建立连接超时（秒）
+HTTP_READ_TIMEOUT = 180  # 两次读取之间的超时（秒），大模型生成较慢需留足余量
+
+# 自适应并发控制（AIMD）
+LIMITER_ENABLED = True
+LIMITER_INITIAL = 8  # 初始并发窗口
+LIMITER_MIN = 1
+LIMITER_MAX = 64
+LIMITER_LATENCY_TOLERANCE = 2.0  # 平均延迟超过基线的倍数时停止增长
+LLM_THROTTLE_RETRIES = 3  # 429/5xx 时在同一密钥上的重试次数
+
+# 作业级公平调度：限制器的等待队列按作业分队列，先按优先级（数值小者优先），同级按权重轮询
+SCHEDULER_INTERACTIVE_PRIORITY = 0  # 单文档的网页请求
+SCHEDULER_BATCH_PRIORITY = 1  # 批量处理
+SCHEDULER_BATCH_WEIGHT_DOCS = 16  # 批量作业的轮询权重为 ceil(该值 / 文档数)，文档少的批量作业出队更多
+
+# 端点熔断
+BREAKER_ENABLED = True
+BREAKER_WINDOW = 20  # 统计错误率的最近调用数
+BREAKER_MIN_CALLS = 5  # 样本达到该数量后才判断熔断
+BREAKER_ERROR_RATE = 0.5  # 错误率达到该值时熔断
+BREAKER_COOLDOWN = 30  # 熔断后多久放行探测请求（秒）
+
+# LLM 服务商：每个服务商独立的连接池、并发上限与鉴权方式，genText 按负载在服务商之间分摊请求
+# ark 的密钥与 endpoint 在 genText 中维护；其余服务商设置对应环境变量后启用
+LLM_PROVIDERS = [
+    {
+        'type': 'ark', 'name': 'ark', 'enabled': True, 'url': ARK_API_URL,
+        'pool_size': HTTP_POOL_SIZE, 'max_concurrency': LIMITER_MAX
+    },
+    {
+        'type': 'ecloud', 'name': 'ecloud', 'enabled': bool(os.environ.get('ECLOUD_ACCESS_KEY')),
+        'url': os.environ.get('ECLOUD_API_URL', 'https://ecloud.10086.cn/api/openapi-icp/inference-api/2003681816805376/'
+                                                'aiops-1295350170291503104/intel-tc-4/service/8080/v1/chat/completions'),
+        'access_key': os.environ.get('ECLOUD_ACCESS_KEY'), 'secret_key': os.environ.get('ECLOUD_SECRET_KEY'),
+        'models': ['deepseek'], 'pool_size': 16, 'max_concurrency': 8
+    },
+    {
+        'type': 'siliconflow', 'name': 'siliconflow', 'enabled': bool(os.environ.get('SILICONFLOW_API_KEY')),
+        'url': os.environ.get('SILICONFLOW_API_URL', 'https://api.siliconflow.cn/v1/chat/completions'),
+        'apikey': os.environ.get('SILICONFLOW_API_KEY'),
+        'models': ['Qwen/QwQ-32B'], 'pool_size': 16, 'max_concurrency': 8
+    }
+]
+
+# 流式输出（SSE）：顶层 JSON 对象闭合后立即返回，不再读取后续说明文字
+LLM_STREAM_ENABLED = os.environ.get('LLM_STREAM', '0') == '1'
+
+# 同一事件循环内内容完全相同且同时在途的提示词只发一次请求，其余调用共享结果
+LLM_SINGLE_FLIGHT_ENABLED = True
+
+# 模型输出的 JSON 不合法时先尝试修复（尾随逗号、截断、前后说明文字、中文引号等），修复不了才重新请求
+LLM_JSON_REPAIR_ENABLED = True
+
+# 对冲请求：主请求超过近期耗时分位仍未返回时，向下一个密钥/端点追加请求
+LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE', '0') == '1'
+LLM_HEDGE_PERCENTILE = 0.9
+LLM_HEDGE_DEFAULT_DELAY = 30  # 样本不足时的等待时间（秒）
+LLM_HEDGE_MIN_DELAY = 1
+
+# 记录真实响应（JSONL），配合 mock_llm --replay 回放
+LLM_RECORD_PATH = os.environ.get('LLM_RECORD_PATH')
+
+# LLM 响应磁盘缓存（SQLite）
+LLM_CACHE_ENABLED = True
+LLM_CACHE_BYPASS = os.environ.get('LLM_CACHE_BYPASS', '0') == '1'  # 跳过读取缓存，仍写入新结果
+LLM_CACHE_PATH = os.path.join(BASE_DIR, 'data/cache/llm_cache.sqlite3')
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 超出后按最近最少使用淘汰
+LLM_CACHE_TTL = None  # 过期时间（秒），None 表示不过期
+
+# 文档级缓存（SQLite），键为 docx 内容的 sha256：分块结果与合并后的单文档 AI 结果；
+# 另按分块内容缓存每个分块的 AI 结果，修订后的文档只重新请求变化的分块
+DOC_CACHE_ENABLED = True
+DOC_CACHE_BYPASS = os.environ.get('DOC_CACHE_BYPASS', '0') == '1'  # 跳过读取缓存，仍写入新结果
+DOC_CHUNK_CACHE_PATH = os.path.join(BASE_DIR, 'data/cache/doc_chunks.sqlite3')
+DOC_RESULT_CACHE_PATH = os.path.join(BASE_DIR, 'data/cache/doc_results.sqlite3')
+DOC_CHUNK_RESULT_CACHE_PATH = os.path.join(BASE_DIR, 'data/cache/chunk_results.sqlite3')  # 按分块内容缓存的分块结果
+DOC_CHUNK_CUTS_CACHE_PATH = os.path.join(BASE_DIR, 'data/cache/chunk_cuts.sqlite3')  # 大表格与长正文的切分点
+DOC_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 每个缓存的上限，超出后按最近最少使用淘汰
 
 
 def logger_configuration(task='server'):
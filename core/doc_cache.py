@@ -0,0 +1,95 @@
+'''
+@Project ：code 
+@File    ：doc_cache.py
+@Author  ：Sito
+@Date    ：2025/3/28 14:00 
+@Description    ：按 docx 内容寻址的文档级缓存
+
+重复上传同一份文档时（每次上传保存在新的目录下），按文档内容的 sha256 复用：
+- 分块缓存：extract_document 的分块结果，跳过解析
+- 结果缓存：合并后的单文档 AI 结果，跳过解析与全部 LLM 请求
+- 分块结果缓存：键为分块内容的 sha256，修订后的文档中内容未变的分块直接复用
+- 切分点：大表格与长正文的切分点（见 chunker.cut_key），修订后的文档沿用原来的切分点，内容未变的分块保持不变
+键同时包含影响结果的配置（分块方式、提示词、模型等），配置变化后自然失效。
+存储沿用 LLMCache（SQLite，按最近访问时间淘汰）。
+'''
+import json
+import hashlib
+import threading
+from core.config import (DOC_CACHE_ENABLED, DOC_CHUNK_CACHE_PATH, DOC_RESULT_CACHE_PATH, DOC_CHUNK_RESULT_CACHE_PATH,
+                         DOC_CHUNK_CUTS_CACHE_PATH, DOC_CACHE_MAX_BYTES, CHUNK_REUSE_CUTS)
+from core.llm_cache import LLMCache
+
+
+def doc_key(digest, settings):
+    """
+    计算文档级缓存键
+
+    Args:
+        digest: 文档或分块内容的 sha256
+        settings: 影响缓存值的配置，可 JSON 序列化
+    """
+    raw = json.dumps([digest, settings], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+_PATHS = {'chunks': DOC_CHUNK_CACHE_PATH, 'results': DOC_RESULT_CACHE_PATH, 'chunk_results': DOC_CHUNK_RESULT_CACHE_PATH,
+          'cuts': DOC_CHUNK_CUTS_CACHE_PATH}
+
+
+def get_doc_cache(kind):
+    """
+    获取进程内共享的文档级缓存
+
+    Args:
+        kind: chunks（分块）、results（单文档 AI 结果）、chunk_results（单个分块的 AI 结果）或 cuts（切分点）
+
+    Returns:
+        LLMCache 实例，缓存关闭时返回 None
+    """
+    if not DOC_CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        if kind not in _caches:
+            _caches[kind] = LLMCache(path=_PATHS[kind], max_bytes=DOC_CACHE_MAX_BYTES)
+    return _caches[kind]
+
+
+class CutSet:
+    """持久化的切分点集合，作为 chunker 的 cuts 参数（支持 in 与 add）
+
+    属性:
+        cache (LLMCache): 存储切分点的缓存
+        settings: 影响切分的配置（预算等），不同配置下的切分点互不复用
+    """
+
+    def __init__(self, cache, settings):
+        self.cache = cache
+        self.settings = settings
+
+    def __contains__(self, key):
+        return self.cache.get(doc_key(key, self.settings)) is not None
+
+    def add(self, key):
+        self.cache.set(doc_key(key, self.settings), '1')
+
+
+def get_cut_set(settings):
+    """
+    获取持久化的切分点集合
+
+    Args:
+        settings: 影响切分的配置，见 CutSet
+
+    Returns:
+        CutSet，缓存或切分点复用关闭时返回 None（贪心切分）
+    """
+    cache = get_doc_cache('cuts') if CHUNK_REUSE_CUTS else None
+    return CutSet(cache, settings) if cache is not None else None
+
+
+def doc_cache_stats():
+    """各文档级缓存的条目数、占用与命中率"""
+    return {kind: get_doc_cache(kind).stats() for kind in _PATHS} if DOC_CACHE_ENABLED else {}
@@ -0,0 +1,169 @@
+'''
+@Project ：code 
+@File    ：docx_stream.py
+@Author  ：Sito
+@Date    ：2025/3/27 10:00 
+@Description    ：流式读取 docx 中的表格
+
+直接打开 docx 压缩包，用 iterparse 逐个解析 word/document.xml 中 body 下的 w:tbl（以及 w:p），
+处理完一个表格就释放对应的 XML 节点，内存占用与文档大小无关。
+输出与 python-docx 的 [[cell.text.strip() for cell in row.cells] for row in table.rows] 一致
+（以 requirements 固定的 0.8.11 为准）：
+- 只读取 body 的直接子表格，嵌套表格与 w:sdt 内的表格不计入
+- 段落只读取直接子 w:r，超链接（w:hyperlink）中的文字不计入；python-docx 1.0 起会计入，这里保持 0.8.11 的行为
+- 横向合并（gridSpan）的单元格按跨越的列数重复
+- 纵向合并的后续单元格（vMerge="continue"）取合并起始单元格的文本
+merged='span' 时合并单元格只输出一次并标注跨度，见 merged_cell
+'''
+import zipfile
+from lxml import etree
+from core.config import MERGED_CELLS
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+BODY = W + 'body'
+TBL = W + 'tbl'
+TR = W + 'tr'
+TC = W + 'tc'
+P = W + 'p'
+R = W + 'r'
+VAL = W + 'val'
+TYPE = W + 'type'
+
+# 与 python-docx 的 CT_R.text 一致的内联元素文本
+_RUN_TEXT = {
+    W + 'tab': '\t',
+    W + 'ptab': '\t',
+    W + 'cr': '\n',
+    W + 'noBreakHyphen': '-',
+}
+
+
+def run_text(r):
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == W + 't':
+            parts.append(child.text or '')
+        elif tag == W + 'br':
+            # 分页符、分栏符没有文本
+            if child.get(TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag in _RUN_TEXT:
+            parts.append(_RUN_TEXT[tag])
+    return ''.join(parts)
+
+
+def paragraph_text(p):
+    """与 python-docx 0.8.11 的 Paragraph.text 一致：只拼接直接子 w:r"""
+    return ''.join(run_text(r) for r in p.iterchildren(R))
+
+
+def cell_text(tc):
+    """单元格文本：直接子段落按换行拼接"""
+    return '\n'.join(paragraph_text(p) for p in tc.iterchildren(P))
+
+
+def _int_prop(parent, path, default):
+    node = parent.find(path) if parent is not None else None
+    if node is None:
+        return default
+    return int(node.get(VAL, default))
+
+
+def merged_cell(text, span, continued):
+    """
+    合并单元格的逻辑输出：每个单元格只出现一次
+
+    - 横向合并：文本后标注 [跨N列]
+    - 纵向合并的后续行：输出 [同上]，不再重复合并起点的文本
+    - 空单元格不加标注
+    """
+    if not text:
+        return ''
+    if continued:
+        return '[同上]'
+    return f'{text}[跨{span}列]' if span > 1 else text
+
+
+def table_rows(tbl, merged=MERGED_CELLS, text=cell_text):
+    """
+    把一个 w:tbl 元素转成行列表
+
+    Args:
+        tbl: w:tbl 元素（lxml，python-docx 的 table._tbl 也可以）
+        merged: repeat 按 python-docx 的方式重复合并单元格；span 每个单元格只输出一次，见 merged_cell
+        text: 读取 w:tc 文本的函数
+
+    Returns:
+        行列表，每行是去除首尾空白的单元格文本列表
+    """
+    rows = []
+    above = {}
+    for tr in tbl.iterchildren(TR):
+        offset = _int_prop(tr.find(W + 'trPr'), W + 'gridBefore', 0)
+        current = {}
+        row = []
+        for tc in tr.iterchildren(TC):
+            tcPr = tc.find(W + 'tcPr')
+            span = _int_prop(tcPr, W + 'gridSpan', 1)
+            v_merge = tcPr.find(W + 'vMerge') if tcPr is not None else None
+            continued = v_merge is not None and v_merge.get(VAL, 'continue') == 'continue'
+            if continued:
+                # 纵向合并的后续单元格：沿用上一行同一列起点的单元格（已解析到合并起点）
+                cell, repeat = above.get(offset, ('', span))
+            else:
+                cell, repeat = text(tc).strip(), span
+            current[offset] = (cell, repeat)
+            if merged == 'span':
+                row.append(merged_cell(cell, repeat, continued))
+            else:
+                row.extend([cell] * repeat)
+            offset += span
+        above = current
+        rows.append(row)
+    return rows
+
+
+def iter_docx_blocks(path, merged=MERGED_CELLS, paragraphs=True):
+    """
+    按文档顺序逐个生成 body 下的段落与表格
+
+    Args:
+        path: docx 文件路径
+        merged: 合并单元格的输出方式，见 table_rows
+        paragraphs: 是否输出 body 的直接子段落（表格之间的正文）
+
+    Yields:
+        ('table', 行列表) 或 ('paragraph', 段落文本)
+    """
+    tags = (P, TBL) if paragraphs else TBL
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as xml:
+        # 只在 w:p / w:tbl 结束时回到 Python，其余节点由 lxml 在 C 层解析
+        for _, element in etree.iterparse(xml, events=('end',), tag=tags):
+            body = element.getparent()
+            if body is None or body.tag != BODY:
+                # 单元格中的段落与嵌套表格，随外层表格一起处理
+                continue
+            if element.tag == TBL:
+                yield 'table', table_rows(element, merged)
+            else:
+                yield 'paragraph', paragraph_text(element)
+            # 释放该节点及之前已处理的节点
+            element.clear()
+            while element.getprevious() is not None:
+                del body[0]
+
+
+def iter_docx_tables(path, merged=MERGED_CELLS):
+    """
+    按文档顺序逐个生成 body 下的表格
+
+    Args:
+        path: docx 文件路径
+        merged: 合并单元格的输出方式，见 table_rows
+
+    Yields:
+        表格的行列表，格式同 table_rows
+    """
+    for _, rows in iter_docx_blocks(path, merged, paragraphs=False):
+        yield rows
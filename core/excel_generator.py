@@ -97,6 +97,10 @@ class ExcelGenerator:
         for col_offset, (l_key, data) in enumerate(sorted(str2_data.items(), key=lambda x: int(x[0][1:])), start_col):
             self._process_str2_column(col_offset, data)
 
+    def append_str2_column(self, index: int, data: dict, str1_num: int):
+        """写入第 index 个STR2列（从 1 开始），可按任意顺序逐列写入"""
+        self._process_str2_column(str1_num + index, data)
+
     def _process_str2_column(self, col: int, data: dict):
         """处理单个STR2列"""
         col_letter = get_column_letter(col)
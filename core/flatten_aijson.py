@@ -126,36 +126,45 @@ class JsonFlattener:
                     print(f"处理文件 {os.path.basename(file_path)} 时出错：{str(e)}")
                     continue
 
-            kd1, kd2, kd3 = self.generate_kd_sets(all_flattened)
-            
-            final_output = OrderedDict()
-            final_output["str0"] = {v:k for k,v in kd1.items()}
-            final_output["str1"] = {v:k.split('##') for k,v in kd2.items()}
-            final_output["str2"] = kd3
-
-            # 计算str1Num
-            str1_num = 0
-            if final_output.get("str1"):
-                first_key = next(iter(final_output["str1"].keys()), None)
-                if first_key and isinstance(final_output["str1"][first_key], list):
-                    str1_num = len(final_output["str1"][first_key])
-
-            # 添加baseinfo并保持顺序
-            new_output = OrderedDict()
-            new_output["baseinfo"] = {"str1Num": str1_num}
-            new_output.update(final_output)
-            
-            # 保存结果
-            output_path = os.path.join(self.output_dir, 'flattened_output.json')
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(new_output, f, ensure_ascii=False, indent=2)
-            
-            return new_output
+            return self.build_output(all_flattened)
 
         except Exception as e:
             print(f"处理过程中发生错误：{str(e)}")
             raise
 
+    def build_output(self, all_flattened: List[str]) -> Dict:
+        """由展平后的数据生成最终结果并保存
+        Args:
+            all_flattened: 所有文档展平后的字符串列表，按文档顺序
+        Returns:
+            处理后的有序字典结果
+        """
+        kd1, kd2, kd3 = self.generate_kd_sets(all_flattened)
+        
+        final_output = OrderedDict()
+        final_output["str0"] = {v:k for k,v in kd1.items()}
+        final_output["str1"] = {v:k.split('##') for k,v in kd2.items()}
+        final_output["str2"] = kd3
+
+        # 计算str1Num
+        str1_num = 0
+        if final_output.get("str1"):
+            first_key = next(iter(final_output["str1"].keys()), None)
+            if first_key and isinstance(final_output["str1"][first_key], list):
+                str1_num = len(final_output["str1"][first_key])
+
+        # 添加baseinfo并保持顺序
+        new_output = OrderedDict()
+        new_output["baseinfo"] = {"str1Num": str1_num}
+        new_output.update(final_output)
+        
+        # 保存结果
+        output_path = os.path.join(self.output_dir, 'flattened_output.json')
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(new_output, f, ensure_ascii=False, indent=2)
+        
+        return new_output
+
 def main():
     try:
         processor = JsonFlattener(
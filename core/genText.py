@@ -17,10 +17,21 @@ embedding:ep-20250226124533-ncq9f
 '''
 import json
 import asyncio
-import requests
 import traceback
 import logging
+import time
 import sys
+from collections import deque
+from core.config import (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, LLM_THROTTLE_RETRIES, LLM_TEMPERATURE,
+                         LLM_CACHE_BYPASS, LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_DEFAULT_DELAY,
+                         LLM_HEDGE_MIN_DELAY, LLM_STREAM_ENABLED, LLM_JSON_REPAIR_ENABLED,
+                         LLM_SINGLE_FLIGHT_ENABLED)
+from core.llm_cache import get_cache, make_key
+from core.llm_json import clean_content, JsonObjectScanner, repair_json
+from core.health import registry, CircuitOpenError
+from core.llm_recorder import get_recorder
+from core.providers import build_providers, ResponseError
+from core.scheduler import current_job
 
 # 配置日志
 def logger_configuration(task='server'):
@@ -60,81 +71,549 @@ endpoints = [
 ]
 
 
-async def genText(prompt):
-    # 尝试所有可用的API密钥
-    for i, apikey in enumerate(apikeys):
+HEDGE_WINDOW = 200  # 参与分位计算的最近样本数
+HEDGE_MIN_SAMPLES = 20
+
+def endpoint_name(i):
+    """第 i 个密钥对应的端点"""
+    return endpoints[min(i, len(endpoints)-1)]
+
+
+# 按 config.LLM_PROVIDERS 创建的服务商，各自持有连接池与并发限制
+PROVIDERS = {}
+# 所有可调用的端点，失败切换与熔断登记都按这里的下标
+backends = []
+
+
+def set_providers(providers):
+    """
+    替换当前使用的服务商（如压测时指向本地模拟服务）
+
+    Args:
+        providers: {服务商名称: Provider}，见 providers.build_providers
+    """
+    global PROVIDERS, backends
+    PROVIDERS = providers
+    backends = [backend for provider in providers.values() for backend in provider.backends]
+    for backend in backends:
+        registry.register(backend.name)
+
+
+set_providers(build_providers(ark_backends=[(apikeys[i], endpoint_name(i)) for i in range(len(apikeys))]))
+
+
+def backend_ids():
+    """
+    当前所有端点的 [服务商, 接口地址, 端点名]（按配置顺序），与 LLM 缓存键一样包含接口地址，
+    指向模拟服务与真实服务的同名端点不会被当成同一个
+    """
+    return [[backend.provider.name, backend.provider.url, backend.name] for backend in backends]
+
+
+def provider_stats():
+    """各服务商的并发窗口与负载"""
+    return {name: provider.stats() for name, provider in PROVIDERS.items()}
+
+
+async def close_session():
+    """关闭当前事件循环中所有服务商的 HTTP 会话，在 asyncio.run 结束前调用"""
+    for provider in PROVIDERS.values():
+        await provider.close_session()
+
+
+async def post_chat(backend, prompt, temperature=LLM_TEMPERATURE):
+    """
+    发送一次 chat completions 请求
+
+    Args:
+        backend: providers.Backend 实例
+        prompt: 提示词
+        temperature: 采样温度
+
+    Returns:
+        (状态码, 响应文本)元组
+    """
+    data = {
+        "model": backend.model,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": temperature
+    }
+    async with backend.provider.post(backend, data) as response:
+        return response.status, await response.text()
+
+
+# 最近流式调用的首字延迟与生成速度
+stream_metrics = deque(maxlen=HEDGE_WINDOW)
+
+
+async def post_chat_stream(backend, prompt, temperature=LLM_TEMPERATURE):
+    """
+    以 stream 模式发送 chat completions 请求，逐段拼接内容，
+    顶层 JSON 对象闭合时立即返回并断开连接
+
+    Returns:
+        (状态码, 内容)元组；状态码非 200 时内容为响应文本
+    """
+    data = {
+        "model": backend.model,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": temperature,
+        "stream": True
+    }
+    start = time.monotonic()
+    first_token = None
+    tokens = 0
+    scanner = JsonObjectScanner()
+    pieces = []
+    async with backend.provider.post(backend, data) as response:
+        if response.status != 200:
+            return response.status, await response.text()
+        if response.content_type != 'text/event-stream':
+            # 网关没有按流式返回（如移动云以 200 返回 state 非 OK 的信封），按非流式响应解析
+            return 200, backend.provider.parse_response(await response.text())
+        async for raw in response.content:
+            line = raw.decode('utf-8').strip()
+            if not line.startswith('data:'):
+                continue
+            payload = line[5:].strip()
+            if payload == '[DONE]':
+                break
+            choices = backend.provider.unwrap(json.loads(payload)).get('choices') or [{}]
+            piece = (choices[0].get('delta') or {}).get('content') or ''
+            if not piece:
+                continue
+            if first_token is None:
+                first_token = time.monotonic() - start
+            tokens += 1
+            pieces.append(piece)
+            if scanner.feed(piece) is not None:
+                # 对象已完整，后续说明文字不再读取
+                response.close()
+                break
+
+    elapsed = time.monotonic() - start
+    generating = elapsed - (first_token or 0)
+    metric = {
+        'endpoint': backend.name,
+        'ttft': round(first_token, 4) if first_token is not None else None,
+        'tokens': tokens,
+        'tokens_per_sec': round(tokens / generating, 2) if generating > 0 else None,
+        'elapsed': round(elapsed, 4),
+        'early_exit': scanner.result is not None
+    }
+    stream_metrics.append(metric)
+    logger.info(f"流式调用完成: 首字 {metric['ttft']}s, {tokens} tokens, {metric['tokens_per_sec']} tokens/s")
+    return 200, scanner.result if scanner.result is not None else ''.join(pieces)
+
+
+def stream_stats():
+    """
+    汇总最近流式调用的指标
+
+    Returns:
+        包含调用数、平均首字延迟、平均生成速度和提前结束次数的字典
+    """
+    metrics = list(stream_metrics)
+    if not metrics:
+        return {'calls': 0}
+    ttfts = [m['ttft'] for m in metrics if m['ttft'] is not None]
+    rates = [m['tokens_per_sec'] for m in metrics if m['tokens_per_sec'] is not None]
+    return {
+        'calls': len(metrics),
+        'avg_ttft': round(sum(ttfts) / len(ttfts), 4) if ttfts else None,
+        'avg_tokens_per_sec': round(sum(rates) / len(rates), 2) if rates else None,
+        'early_exits': sum(1 for m in metrics if m['early_exit'])
+    }
+
+
+def is_throttled(status):
+    return status == 429 or status >= 500
+
+
+async def limited_post_chat(backend, prompt, stream=False):
+    """
+    在所属服务商的自适应并发限制下发送请求，429/5xx 时按缩小后的窗口重新排队重试
+
+    Args:
+        stream: 为 True 时使用 post_chat_stream
+
+    Returns:
+        (状态码, 响应文本)元组；流式模式下状态码为 200 时返回拼接后的内容
+    """
+    send = post_chat_stream if stream else post_chat
+    limiter = backend.provider.limiter
+    endpoint = backend.name
+    for attempt in range(LLM_THROTTLE_RETRIES + 1):
+        await limiter.acquire()
+        if registry.is_open(endpoint):
+            # 排队期间端点已被熔断，不再发出请求
+            limiter.abandon()
+            raise CircuitOpenError(endpoint)
+        start = time.monotonic()
+        try:
+            status, body = await send(backend, prompt)
+        except ResponseError:
+            # 服务商正常应答了失败，不是过载信号
+            limiter.release(time.monotonic() - start)
+            raise
+        except Exception:
+            # 超时、连接失败同样视为过载信号
+            limiter.release(time.monotonic() - start, error=True)
+            raise
+        except BaseException:
+            limiter.abandon()
+            raise
+        limiter.release(time.monotonic() - start, error=is_throttled(status))
+        if not is_throttled(status) or attempt == LLM_THROTTLE_RETRIES:
+            return status, body
+        logger.info(f"端点 {endpoint} 返回 {status}，第 {attempt + 1} 次重试")
+        await asyncio.sleep(0.5 * 2 ** attempt)
+    return status, body
+
+
+# 近期成功调用的耗时，用于计算对冲请求的触发时机
+_recent_latencies = deque(maxlen=HEDGE_WINDOW)
+
+
+def hedge_delay():
+    """
+    对冲请求的等待时间：近期调用耗时的 LLM_HEDGE_PERCENTILE 分位
+
+    Returns:
+        秒数；样本不足时返回 LLM_HEDGE_DEFAULT_DELAY
+    """
+    if len(_recent_latencies) < HEDGE_MIN_SAMPLES:
+        return LLM_HEDGE_DEFAULT_DELAY
+    ordered = sorted(_recent_latencies)
+    index = min(len(ordered) - 1, int(len(ordered) * LLM_HEDGE_PERCENTILE))
+    return max(LLM_HEDGE_MIN_DELAY, ordered[index])
+
+
+def backend_key(backend, prompt):
+    return make_key(backend.provider.url, backend.name, prompt, LLM_TEMPERATURE)
+
+
+def cache_keys(prompt, names=None):
+    """所有端点（给出 names 时只取这些端点）对应的缓存键，按配置顺序排列"""
+    return [backend_key(backend, prompt) for backend in backends if names is None or backend.name in names]
+
+
+def failover_order(names=None):
+    """
+    本次调用的端点尝试顺序：服务商按当前负载从低到高排列，
+    同一服务商内保持配置顺序；只有一个服务商时即为配置顺序
+
+    Args:
+        names: 只使用这些端点（如级联模式的某一级），None 表示全部
+
+    Returns:
+        backends 下标列表
+    """
+    ranked = sorted(PROVIDERS.values(), key=lambda provider: provider.load())
+    return [backends.index(backend) for provider in ranked for backend in provider.backends
+            if names is None or backend.name in names]
+
+
+def next_allowed(order, start):
+    """
+    从 order[start] 开始找到下一个未熔断的端点
+
+    Returns:
+        order 中的位置，全部熔断时返回 None
+    """
+    for pos in range(start, len(order)):
+        name = backends[order[pos]].name
+        if registry.allow(name):
+            return pos
+        logger.info(f"端点 {name} 已熔断，跳过")
+    return None
+
+
+# 模型输出的 JSON 处理结果：直接有效 / 修复后使用（其中截断的） / 无法修复而重新请求 / 最终丢失
+json_outcomes = {'valid': 0, 'repaired': 0, 'truncated': 0, 'recalled': 0, 'lost': 0}
+
+
+def json_stats():
+    """返回 JSON 处理结果计数"""
+    return dict(json_outcomes)
+
+
+async def try_endpoint(i, prompt, cache, stream=False):
+    """
+    使用第 i 个密钥/端点请求一次
+
+    Args:
+        i: backends 下标
+        prompt: 提示词
+        cache: LLMCache 实例或 None，成功时写入
+        stream: 是否使用流式输出
+
+    Returns:
+        校验通过的 JSON 字符串，失败时返回 None
+    """
+    backend = backends[i]
+    endpoint = backend.name
+    start = time.monotonic()
+    try:
+        logger.info(f"尝试使用端点 {i+1}/{len(backends)}: {backend.provider.name} / {endpoint}")
+
+        # 复用服务商的连接池，避免每个分块重新握手
+        status, body = await limited_post_chat(backend, prompt, stream=stream)
+
+        if status != 200:
+            registry.record(endpoint, False, time.monotonic() - start)
+            logger.error(f"请求失败，状态码 {status}: {body[:200]}...")
+            return None
+
+        if stream:
+            content = body
+        else:
+            try:
+                # 各服务商的响应格式不同（如移动云外层有信封），由服务商解析
+                content = backend.provider.parse_response(body)
+            except ResponseError:
+                raise
+            except Exception as e:
+                registry.record(endpoint, True, time.monotonic() - start)
+                logger.error(f"解析响应失败: {str(e)}")
+                return None
+        registry.record(endpoint, True, time.monotonic() - start)
+
+        # 清理内容中的markdown标记
+        cleaned_content = clean_content(content)
+
+        # 验证返回的内容是有效的JSON，不合法时先尝试修复，修复不了才换端点重新生成
         try:
-            url = 'https://ark.cn-beijing.volces.com/api/v3/chat/completions'
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {apikey}"
-            }
-
-            # 使用对应的endpoint
-            endpoint = endpoints[min(i, len(endpoints)-1)]
-            
-            data = {
-                "model": endpoint,
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7
-            }
-            
-            logger.info(f"尝试使用API密钥 {i+1}/{len(apikeys)} 和端点 {endpoint}")
-            
-            # 使用requests而不是aiohttp
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                lambda: requests.post(url, headers=headers, json=data)
-            )
-            
-            if response.status_code == 200:
-                try:
-                    response_data = response.json()
-                    content = response_data['choices'][0]['message']['content']
-                    # 清理内容中的markdown标记
-                    cleaned_content = content.replace('```json', '').replace('```', '')
-                    
-                    # 验证返回的内容是有效的JSON
-                    try:
-                        json.loads(cleaned_content)
-                        return cleaned_content
-                    except json.JSONDecodeError:
-                        logger.error(f"API返回的内容不是有效的JSON: {cleaned_content[:100]}...")
-                        # 如果这是最后一个API密钥，返回一个空的有效JSON
-                        if i == len(apikeys) - 1:
-                            logger.error("所有API密钥都失败，返回空JSON")
-                            return "{}"
-                        continue
-                        
-                except Exception as e:
-                    logger.error(f"解析响应失败: {str(e)}")
-                    if i == len(apikeys) - 1:
-                        return "{}"
-                    continue
-            else:
-                logger.error(f"请求失败，状态码 {response.status_code}: {response.text[:200]}...")
-                # 如果这是最后一个API密钥，返回一个空的有效JSON
-                if i == len(apikeys) - 1:
-                    logger.error("所有API密钥都失败，返回空JSON")
-                    return "{}"
+            json.loads(cleaned_content)
+            json_outcomes['valid'] += 1
+        except json.JSONDecodeError:
+            repaired, truncated = repair_json(cleaned_content) if LLM_JSON_REPAIR_ENABLED else (None, False)
+            if repaired is None:
+                json_outcomes['recalled'] += 1
+                logger.error(f"API返回的内容不是有效的JSON且无法修复: {cleaned_content[:100]}...")
+                return None
+            json_outcomes['repaired'] += 1
+            if truncated:
+                json_outcomes['truncated'] += 1
+            logger.warning(f"API返回的JSON已修复{'（输出被截断）' if truncated else ''}: {cleaned_content[:100]}...")
+            cleaned_content = json.dumps(repaired, ensure_ascii=False)
+
+        latency = time.monotonic() - start
+        _recent_latencies.append(latency)
+        recorder = get_recorder()
+        if recorder is not None:
+            recorder.record(prompt, endpoint, cleaned_content, latency)
+        if cache is not None:
+            cache.set(backend_key(backend, prompt), cleaned_content)
+        return cleaned_content
+
+    except asyncio.CancelledError:
+        registry.release_probe(endpoint)
+        raise
+    except CircuitOpenError:
+        logger.info(f"端点 {endpoint} 已熔断，跳过")
+        return None
+    except ResponseError as e:
+        # 状态码 200 但服务商返回失败，与非 200 同样计入熔断
+        registry.record(endpoint, False, time.monotonic() - start)
+        logger.error(f"服务商返回失败: {e}")
+        return None
+    except asyncio.TimeoutError:
+        registry.record(endpoint, False, time.monotonic() - start)
+        logger.error(f"请求超时（连接 {HTTP_CONNECT_TIMEOUT}s / 读取 {HTTP_READ_TIMEOUT}s）")
+        return None
+    except Exception as e:
+        registry.record(endpoint, False, time.monotonic() - start)
+        logger.error(f"请求过程中发生错误: {str(e)}")
+        traceback.print_exc()
+        return None
+
+
+async def hedged_genText(prompt, cache, order, stream=False):
+    """
+    对冲模式：主请求超过近期耗时分位仍未返回时，向下一个密钥/端点追加请求，
+    取最先返回的有效 JSON 并取消其余请求；请求失败时立即启用下一个端点
+
+    Args:
+        order: failover_order() 给出的端点顺序
+
+    Returns:
+        校验通过的 JSON 字符串，全部失败时返回 None
+    """
+    pending = set()
+    next_index = 0
+
+    def launch(pos=None):
+        nonlocal next_index
+        if pos is None:
+            pos = next_allowed(order, next_index)
+        if pos is None:
+            next_index = len(order)
+            return False
+        pending.add(asyncio.ensure_future(try_endpoint(order[pos], prompt, cache, stream)))
+        next_index = pos + 1
+        return True
+
+    if not launch():
+        logger.error("所有端点均已熔断，仍尝试第一个端点")
+        launch(0)
+    try:
+        while pending:
+            timeout = hedge_delay() if next_index < len(order) else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info(f"请求超过 {timeout:.1f}s 未返回，追加对冲请求")
+                launch()
                 continue
-                
-        except Exception as e:
-            logger.error(f"请求过程中发生错误: {str(e)}")
-            traceback.print_exc()
-            # 如果这是最后一个API密钥，返回一个空的有效JSON
-            if i == len(apikeys) - 1:
-                logger.error("所有API密钥都失败，返回空JSON")
-                return "{}"
-            continue
-    
+            for task in done:
+                pending.discard(task)
+                result = task.result()
+                if result is not None:
+                    return result
+            # 有请求失败，立即切换到下一个端点
+            if next_index < len(order):
+                launch()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class _Flight:
+    """一次在途的 LLM 调用及等待它的调用方数量"""
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+# 在途调用：(事件循环, 提示词, 端点范围) -> _Flight
+_flights = {}
+# 进程内单飞合并计数：调用总数 / 合并到已有请求的调用数；每个作业另在 Job 上计数
+flight_outcomes = {'calls': 0, 'coalesced': 0}
+
+
+def dedup_stats(job=None):
+    """
+    单飞合并统计
+
+    Args:
+        job: 给出时只统计该作业（如一次 process_docx）的调用，不受并发的其他作业影响；None 时为进程累计
+
+    Returns:
+        包含调用数、合并数与合并比例的字典
+    """
+    if job is not None:
+        calls, coalesced = job.llm_calls, job.coalesced
+    else:
+        calls, coalesced = flight_outcomes['calls'], flight_outcomes['coalesced']
+    return {
+        'calls': calls,
+        'coalesced': coalesced,
+        'dedup_ratio': round(coalesced / calls, 4) if calls else 0.0
+    }
+
+
+async def _join(flight):
+    """等待在途调用的结果；所有调用方都取消时才取消请求本身"""
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    except asyncio.CancelledError:
+        if not flight.task.done() and flight.waiters == 1:
+            flight.task.cancel()
+        raise
+    finally:
+        flight.waiters -= 1
+
+
+async def genText(prompt, bypass_cache=LLM_CACHE_BYPASS, hedge=LLM_HEDGE_ENABLED, stream=LLM_STREAM_ENABLED,
+                  names=None):
+    """
+    调用 LLM 生成 JSON 文本；与正在进行的调用提示词完全相同时直接共享其结果
+
+    Args:
+        prompt: 提示词
+        bypass_cache: 为 True 时不读取缓存（结果仍会写入缓存）
+        hedge: 为 True 时启用对冲请求
+        stream: 为 True 时使用流式输出，JSON 对象闭合即返回
+        names: 只使用这些端点（按 endpoint 名称），None 表示全部
+
+    Returns:
+        校验通过的 JSON 字符串，全部失败时返回 "{}"
+    """
+    names = tuple(names) if names is not None else None
+    job = current_job.get()
+    flight_outcomes['calls'] += 1
+    job.llm_calls += 1
+    if not LLM_SINGLE_FLIGHT_ENABLED:
+        return await _genText(prompt, bypass_cache, hedge, stream, names)
+
+    # Future 与事件循环绑定，按循环分别合并
+    key = (asyncio.get_running_loop(), prompt, names)
+    flight = _flights.get(key)
+    if flight is not None:
+        flight_outcomes['coalesced'] += 1
+        job.coalesced += 1
+        logger.info("相同提示词的请求正在进行，等待共享结果")
+    else:
+        flight = _Flight(asyncio.ensure_future(_genText(prompt, bypass_cache, hedge, stream, names)))
+        _flights[key] = flight
+        flight.task.add_done_callback(lambda _: _flights.pop(key, None))
+    return await _join(flight)
+
+
+async def _genText(prompt, bypass_cache, hedge, stream, names):
+    """
+    调用 LLM 生成 JSON 文本，从负载最低的服务商开始依次失败切换，跳过已熔断的端点
+
+    Returns:
+        校验通过的 JSON 字符串，全部失败时返回 "{}"
+    """
+    cache = get_cache()
+    if cache is not None and not bypass_cache:
+        key, cached = cache.get_first(cache_keys(prompt, names))
+        if cached is not None:
+            logger.info("命中缓存")
+            return cached
+
+    order = failover_order(names)
+    if not order:
+        logger.error(f"没有可用的端点: {names}")
+        json_outcomes['lost'] += 1
+        return "{}"
+    if hedge and len(order) > 1:
+        result = await hedged_genText(prompt, cache, order, stream)
+        if result is not None:
+            return result
+    else:
+        # 依次尝试所有可用的端点
+        pos = next_allowed(order, 0)
+        if pos is None:
+            logger.error("所有端点均已熔断，仍尝试第一个端点")
+            pos = 0
+        while pos is not None:
+            result = await try_endpoint(order[pos], prompt, cache, stream)
+            if result is not None:
+                return result
+            pos = next_allowed(order, pos + 1)
+
     # 如果所有API密钥都失败，返回一个空的有效JSON
+    json_outcomes['lost'] += 1
+    logger.error("所有API密钥都失败，返回空JSON")
     return "{}"
 
 
 if __name__ == '__main__':
-    text = asyncio.run(genText('''你是谁'''))
+    async def _main():
+        try:
+            return await genText('''你是谁''')
+        finally:
+            await close_session()
+
+    text = asyncio.run(_main())
     print(text)
@@ -0,0 +1,167 @@
+'''
+@Project ：code 
+@File    ：health.py
+@Author  ：Sito
+@Date    ：2025/3/19 10:20 
+@Description    ：LLM 端点健康登记与熔断
+
+每个端点维护最近调用的成功/失败与耗时，错误率超过阈值时熔断（open），
+冷却后放行一个探测请求（half-open），探测成功则恢复（closed）。
+'''
+import time
+import threading
+from collections import deque
+from core.config import (BREAKER_ENABLED, BREAKER_WINDOW, BREAKER_MIN_CALLS, BREAKER_ERROR_RATE, BREAKER_COOLDOWN,
+                         logger_configuration)
+
+logger = logger_configuration('health')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """排队期间端点被熔断，请求未发出"""
+
+
+class EndpointHealth:
+    """单个端点的滚动统计与熔断状态"""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=BREAKER_WINDOW)  # (是否成功, 耗时)
+        self.opened_at = None
+        self.probing = False
+        self.total_calls = 0
+        self.total_failures = 0
+        self.skipped = 0
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+
+    @property
+    def avg_latency(self):
+        latencies = [latency for ok, latency in self.outcomes if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def to_dict(self):
+        avg_latency = self.avg_latency
+        return {
+            'name': self.name,
+            'state': self.state,
+            'error_rate': round(self.error_rate, 4),
+            'avg_latency': round(avg_latency, 4) if avg_latency is not None else None,
+            'recent_calls': len(self.outcomes),
+            'total_calls': self.total_calls,
+            'total_failures': self.total_failures,
+            'skipped': self.skipped,
+            'opened_at': self.opened_at
+        }
+
+
+class HealthRegistry:
+    """进程内共享的端点健康登记表，线程安全"""
+
+    def __init__(self, cooldown=BREAKER_COOLDOWN, enabled=BREAKER_ENABLED):
+        self.cooldown = cooldown
+        self.enabled = enabled
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def register(self, name):
+        """预先登记端点，使其在查询结果中可见"""
+        with self._lock:
+            self._get(name)
+
+    def _get(self, name):
+        health = self._endpoints.get(name)
+        if health is None:
+            health = self._endpoints[name] = EndpointHealth(name)
+        return health
+
+    def allow(self, name):
+        """
+        判断是否可以向该端点发送请求
+
+        Returns:
+            closed 时为 True；open 且冷却结束时转为 half-open 并放行一个探测请求
+        """
+        with self._lock:
+            health = self._get(name)
+            if not self.enabled or health.state == CLOSED:
+                return True
+            if health.state == OPEN and time.time() - health.opened_at >= self.cooldown:
+                health.state = HALF_OPEN
+                health.probing = False
+            if health.state == HALF_OPEN and not health.probing:
+                health.probing = True
+                logger.info(f"端点 {name} 冷却结束，发送探测请求")
+                return True
+            health.skipped += 1
+            return False
+
+    def is_open(self, name):
+        """端点是否处于熔断且仍在冷却期（不占用探测名额，为 True 时计入跳过次数）"""
+        with self._lock:
+            health = self._get(name)
+            if self.enabled and health.state == OPEN and time.time() - health.opened_at < self.cooldown:
+                health.skipped += 1
+                return True
+            return False
+
+    def record(self, name, ok, latency=None):
+        """
+        记录一次调用结果并更新熔断状态
+
+        Args:
+            name: 端点名
+            ok: 是否成功（HTTP 状态码与服务商在响应体中返回的状态）
+            latency: 耗时（秒）
+        """
+        with self._lock:
+            health = self._get(name)
+            health.outcomes.append((ok, latency))
+            health.total_calls += 1
+            if not ok:
+                health.total_failures += 1
+            if health.state == HALF_OPEN:
+                health.probing = False
+                if ok:
+                    health.state = CLOSED
+                    health.outcomes.clear()
+                    health.opened_at = None
+                    logger.info(f"端点 {name} 探测成功，恢复")
+                else:
+                    health.state = OPEN
+                    health.opened_at = time.time()
+                    logger.info(f"端点 {name} 探测失败，继续熔断")
+            elif health.state == CLOSED and len(health.outcomes) >= BREAKER_MIN_CALLS \
+                    and health.error_rate >= BREAKER_ERROR_RATE:
+                health.state = OPEN
+                health.opened_at = time.time()
+                logger.info(f"端点 {name} 错误率 {health.error_rate:.0%}，熔断 {self.cooldown}s")
+
+    def release_probe(self, name):
+        """探测请求被取消（如对冲中落败）时归还探测名额"""
+        with self._lock:
+            health = self._get(name)
+            if health.state == HALF_OPEN:
+                health.probing = False
+
+    def snapshot(self):
+        """
+        查询所有端点的状态
+
+        Returns:
+            端点状态字典列表
+        """
+        with self._lock:
+            return [health.to_dict() for health in self._endpoints.values()]
+
+
+registry = HealthRegistry()
@@ -0,0 +1,169 @@
+'''
+@Project ：code 
+@File    ：limiter.py
+@Author  ：Sito
+@Date    ：2025/3/12 15:30 
+@Description    ：LLM 请求的自适应并发控制（AIMD）
+
+窗口大小在延迟与错误率正常时加性增长，遇到 429/5xx/超时时乘性减半。
+状态通过 stats() 查询；内部使用线程锁，可被多个事件循环（如 Flask 的并发请求）共享。
+'''
+import time
+import asyncio
+import threading
+from collections import deque
+from core.scheduler import FairQueue
+from core.config import (LIMITER_ENABLED, LIMITER_INITIAL, LIMITER_MIN, LIMITER_MAX,
+                         LIMITER_LATENCY_TOLERANCE, logger_configuration)
+
+logger = logger_configuration('limiter')
+
+
+class AdaptiveLimiter:
+    """AIMD 自适应并发限制器
+
+    属性:
+        window (float): 当前并发窗口
+        in_flight (int): 正在执行的请求数
+        enabled (bool): 为 False 时不做限制，仅记录指标
+    """
+
+    def __init__(self, initial=LIMITER_INITIAL, min_window=LIMITER_MIN, max_window=LIMITER_MAX,
+                 latency_tolerance=LIMITER_LATENCY_TOLERANCE, enabled=LIMITER_ENABLED):
+        self.window = float(initial)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.latency_tolerance = latency_tolerance
+        self.enabled = enabled
+        self.in_flight = 0
+        self.latency_ewma = None
+        self._latencies = deque(maxlen=200)
+        self._outcomes = deque(maxlen=100)
+        self._last_decrease = 0.0
+        # 按作业公平出队的等待队列，见 scheduler.py
+        self._waiters = FairQueue()
+        # 已由 _wake 分配名额、但等待方尚未恢复执行的 future
+        self._granted = set()
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.completed = 0
+
+    def _has_room(self):
+        return not self.enabled or self.in_flight < int(self.window)
+
+    async def acquire(self):
+        """获取一个并发名额，窗口已满时排队等待"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._has_room() and not self._waiters:
+                self.in_flight += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if future in self._granted:
+                    # 名额已分配给本协程，归还
+                    self._granted.discard(future)
+                    self.in_flight -= 1
+                    self._wake()
+                else:
+                    # 仍在排队，或已被 _wake 作为已取消的请求跳过（未占用名额）
+                    try:
+                        self._waiters.remove((loop, future))
+                    except ValueError:
+                        pass
+            raise
+        with self._lock:
+            self._granted.discard(future)
+
+    def _wake(self):
+        """在持有锁的情况下唤醒排队的请求"""
+        while self._waiters and self._has_room():
+            loop, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            self._granted.add(future)
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def abandon(self):
+        """归还名额但不计入统计（请求被取消或未发出）"""
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def release(self, latency, error=False):
+        """
+        归还名额并根据本次结果调整窗口
+
+        Args:
+            latency: 本次请求耗时（秒）
+            error: 是否为限流/服务端错误（429、5xx、超时）
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self._outcomes.append(1 if error else 0)
+            if error:
+                self.throttled += 1
+                # 一个往返时间内只减半一次，避免同一批失败把窗口压到底
+                rtt = self.latency_ewma or latency
+                if now - self._last_decrease >= rtt:
+                    self.window = max(self.min_window, self.window / 2)
+                    self._last_decrease = now
+                    logger.info(f"收到限流/错误，并发窗口下调至 {self.window:.1f}")
+            else:
+                self._latencies.append(latency)
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+                if self._latency_healthy():
+                    # 每个窗口的成功请求累计增加 1
+                    self.window = min(self.max_window, self.window + 1 / self.window)
+            self._wake()
+
+    def _latency_healthy(self):
+        baseline = self._baseline_latency()
+        return baseline is None or self.latency_ewma <= baseline * self.latency_tolerance
+
+    def _baseline_latency(self):
+        """近期延迟的 10 分位作为无排队时的基线"""
+        if len(self._latencies) < 10:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[len(ordered) // 10]
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    @property
+    def error_rate(self):
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def stats(self):
+        """
+        查询当前状态
+
+        Returns:
+            包含窗口、在途请求、排队数、延迟和错误率的字典
+        """
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'window': round(self.window, 2),
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._waiters),
+                'latency_ewma': round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+                'latency_baseline': self._baseline_latency(),
+                'error_rate': round(self.error_rate, 4),
+                'completed': self.completed,
+                'throttled': self.throttled
+            }
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
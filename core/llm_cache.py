@@ -0,0 +1,169 @@
+'''
+@Project ：code 
+@File    ：llm_cache.py
+@Author  ：Sito
+@Date    ：2025/3/13 10:05 
+@Description    ：按内容寻址的 LLM 响应磁盘缓存
+
+键为 sha256(接口地址, 模型端点, 提示词, 温度)，值为校验通过的 JSON 文本。
+存储使用 SQLite，超过容量上限时按最近访问时间淘汰，可选 TTL。
+'''
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from core.config import (LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL,
+                         logger_configuration)
+
+logger = logger_configuration('llm_cache')
+
+
+def make_key(url, endpoint, prompt, temperature):
+    """计算缓存键"""
+    raw = json.dumps([url, endpoint, prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """SQLite 实现的 LRU 响应缓存
+
+    属性:
+        path (str): 数据库文件路径
+        max_bytes (int): 缓存值总大小上限
+        ttl (float): 过期时间（秒），None 表示不过期
+        hits / misses / evictions (int): 命中、未命中与淘汰计数
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL)''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed)')
+        self._total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def _lookup(self, key, now):
+        """在持有锁的情况下查找，过期条目顺带删除"""
+        row = self._conn.execute('SELECT value, size, created FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, size, created = row
+        if self.ttl is not None and now - created > self.ttl:
+            self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self._total -= size
+            return None
+        self._conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return value
+
+    def get(self, key):
+        """
+        读取缓存
+
+        Returns:
+            命中时返回缓存的文本，否则返回 None
+        """
+        return self.get_first([key])[1]
+
+    def get_first(self, keys):
+        """
+        按顺序查找多个键，返回第一个命中的值，整体只计一次命中或未命中
+
+        Returns:
+            (命中的键, 值)元组，未命中时返回 (None, None)
+        """
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                value = self._lookup(key, now)
+                if value is not None:
+                    self.hits += 1
+                    return key, value
+            self.misses += 1
+            return None, None
+
+    def set(self, key, value):
+        """写入缓存，必要时淘汰最久未访问的条目"""
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            if old is not None:
+                self._total -= old[0]
+            self._conn.execute('INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                               (key, value, size, now, now))
+            self._total += size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """淘汰至容量上限的 90%，避免每次写入都触发淘汰"""
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute('SELECT key, size FROM entries ORDER BY accessed ASC').fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._total <= target:
+                break
+            doomed.append((key,))
+            self._total -= size
+        self._conn.executemany('DELETE FROM entries WHERE key = ?', doomed)
+        self.evictions += len(doomed)
+        logger.info(f"缓存超出上限，淘汰 {len(doomed)} 条")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM entries')
+            self._total = 0
+
+    def stats(self):
+        """
+        查询缓存状态
+
+        Returns:
+            包含条目数、占用大小、命中/未命中/淘汰计数与命中率的字典
+        """
+        with self._lock:
+            count = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'entries': count,
+            'bytes': self._total,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    获取进程内共享的缓存实例
+
+    Returns:
+        LLMCache 实例，缓存关闭时返回 None
+    """
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+    return _cache
@@ -0,0 +1,264 @@
+'''
+@Project ：code 
+@File    ：llm_json.py
+@Author  ：Sito
+@Date    ：2025/3/14 10:30 
+@Description    ：LLM 输出中的 JSON 处理：清理 markdown 标记、流式输出中检测完整的顶层对象、修复常见格式错误
+'''
+import json
+
+
+def clean_content(content):
+    """清理内容中的markdown标记"""
+    return content.replace('```json', '').replace('```', '')
+
+
+class JsonObjectScanner:
+    """增量扫描流式文本，顶层 JSON 对象闭合时立即给出
+
+    跳过第一个 '{' 之前的内容（如 ```json 标记或说明文字），
+    跟踪字符串与转义状态，避免把字符串里的括号算进层级。
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+        self.result = None
+
+    def feed(self, text):
+        """
+        追加一段文本
+
+        Args:
+            text: 新到达的内容片段
+
+        Returns:
+            顶层对象闭合时返回完整的对象文本，否则返回 None
+        """
+        if self.result is not None:
+            return self.result
+        for ch in text:
+            if not self.started:
+                if ch != '{':
+                    continue
+                self.started = True
+            self.buffer.append(ch)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+            if ch == '"':
+                self.in_string = True
+            elif ch in '{[':
+                self.depth += 1
+            elif ch in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.result = ''.join(self.buffer)
+                    return self.result
+        return None
+
+    @property
+    def partial(self):
+        """目前已收集的文本（对象未闭合时使用）"""
+        return ''.join(self.buffer)
+
+
+# 结构位置上可作为字符串起止的引号：开引号 -> 可接受的闭引号
+QUOTES = {'"': '"”', '“': '”"', '”': '”"', "'": "'"}
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', '\\': '\\', '/': '/'}
+
+
+class _Truncated(Exception):
+    """标量值在输出末尾被截断"""
+
+
+class _LenientParser:
+    """宽松的递归下降解析器
+
+    容忍：对象前后的说明文字、多余/尾随逗号、中文引号与单引号、全角冒号、
+    字符串内未转义的引号与换行、无引号的值、输出被截断（保留已完整的成员）。
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+        self.truncated = False
+
+    def peek(self):
+        return self.text[self.pos] if self.pos < len(self.text) else ''
+
+    def skip_ws(self):
+        while self.pos < len(self.text) and self.text[self.pos] in ' \t\r\n':
+            self.pos += 1
+
+    def parse_value(self):
+        self.skip_ws()
+        ch = self.peek()
+        if ch == '':
+            raise _Truncated()
+        if ch == '{':
+            return self.parse_object()
+        if ch == '[':
+            return self.parse_array()
+        if ch in QUOTES:
+            return self.parse_string()
+        return self.parse_bare()
+
+    def parse_object(self):
+        self.pos += 1
+        obj = {}
+        while True:
+            self.skip_ws()
+            ch = self.peek()
+            if ch == '':
+                self.truncated = True
+                return obj
+            if ch in ',;':
+                self.pos += 1
+                continue
+            if ch == '}':
+                self.pos += 1
+                return obj
+            if ch == ']':
+                # 括号不匹配，按对象结束处理
+                self.pos += 1
+                return obj
+            try:
+                key = self.parse_string() if ch in QUOTES else self.parse_bare(stops=':\uff1a,}')
+                self.skip_ws()
+                if self.peek() not in (':', '\uff1a'):
+                    if self.peek() == '':
+                        raise _Truncated()
+                    # 缺少冒号的键直接丢弃
+                    continue
+                self.pos += 1
+                obj[str(key)] = self.parse_value()
+            except _Truncated:
+                self.truncated = True
+                return obj
+
+    def parse_array(self):
+        self.pos += 1
+        items = []
+        while True:
+            self.skip_ws()
+            ch = self.peek()
+            if ch == '':
+                self.truncated = True
+                return items
+            if ch == ',':
+                self.pos += 1
+                continue
+            if ch in ']}':
+                self.pos += 1
+                return items
+            try:
+                items.append(self.parse_value())
+            except _Truncated:
+                self.truncated = True
+                return items
+
+    def closes_here(self, i):
+        """引号后（跳过空白）是结构字符或文本末尾时，才认为字符串在此结束"""
+        i += 1
+        while i < len(self.text) and self.text[i] in ' \t\r\n':
+            i += 1
+        return i >= len(self.text) or self.text[i] in ',}]:\uff1a'
+
+    def parse_string(self):
+        closers = QUOTES[self.text[self.pos]]
+        self.pos += 1
+        chars = []
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            if ch == '\\':
+                nxt = self.text[self.pos + 1:self.pos + 2]
+                if nxt == 'u' and len(self.text) >= self.pos + 6:
+                    try:
+                        chars.append(chr(int(self.text[self.pos + 2:self.pos + 6], 16)))
+                        self.pos += 6
+                        continue
+                    except ValueError:
+                        pass
+                chars.append(ESCAPES.get(nxt, nxt))
+                self.pos += 2
+                continue
+            if ch in closers and self.closes_here(self.pos):
+                self.pos += 1
+                return ''.join(chars)
+            chars.append(ch)
+            self.pos += 1
+        raise _Truncated()
+
+    def parse_bare(self, stops=',}]\n'):
+        start = self.pos
+        while self.pos < len(self.text) and self.text[self.pos] not in stops:
+            self.pos += 1
+        if self.pos >= len(self.text):
+            raise _Truncated()
+        token = self.text[start:self.pos].strip()
+        try:
+            return json.loads(token)
+        except ValueError:
+            return token
+
+
+def repair_json(text):
+    """
+    从不合法的 LLM 输出中尽量恢复最大的有效 JSON 对象
+
+    Args:
+        text: 已清理 markdown 标记的模型输出
+
+    Returns:
+        (对象, 是否截断)；找不到对象或只恢复出空对象时返回 (None, 截断标记)
+    """
+    start = text.find('{')
+    if start < 0:
+        return None, False
+    parser = _LenientParser(text[start:])
+    obj = parser.parse_object()
+    if not obj:
+        return None, parser.truncated
+    return obj, parser.truncated
+
+
+def conform_to_schema(obj, schema):
+    """
+    只保留 schema（如 level_label）中存在的三级路径
+
+    Args:
+        obj: 模型输出的对象
+        schema: 三级嵌套的标签结构
+
+    Returns:
+        (规整后的对象, 丢弃的叶子数)
+    """
+    if not isinstance(obj, dict):
+        return {}, 1
+    result = {}
+    dropped = 0
+    for k, second in obj.items():
+        if k not in schema or not isinstance(second, dict):
+            dropped += 1
+            continue
+        for kk, third in second.items():
+            if kk not in schema[k] or not isinstance(third, dict):
+                dropped += 1
+                continue
+            for kkk, value in third.items():
+                if kkk not in schema[k][kk] or isinstance(value, (dict, list)):
+                    dropped += 1
+                    continue
+                if value is None:
+                    continue
+                result.setdefault(k, {}).setdefault(kk, {})[kkk] = value if isinstance(value, str) else str(value)
+    return result, dropped
@@ -0,0 +1,82 @@
+'''
+@Project ：code 
+@File    ：llm_recorder.py
+@Author  ：Sito
+@Date    ：2025/3/20 10:10 
+@Description    ：记录 genText 的真实响应，供本地模拟服务按提示词确定性回放
+
+设置环境变量 LLM_RECORD_PATH 后，每次成功调用追加一行 JSONL：
+{"key": sha256(提示词), "endpoint": ..., "content": ..., "latency": ...}
+'''
+import os
+import json
+import time
+import hashlib
+import threading
+from core.config import LLM_RECORD_PATH
+
+
+def prompt_key(prompt):
+    """回放时用于匹配的键"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class Recorder:
+    """追加写入 JSONL 的响应记录器，线程安全"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, prompt, endpoint, content, latency):
+        line = json.dumps({
+            'key': prompt_key(prompt),
+            'endpoint': endpoint,
+            'content': content,
+            'latency': round(latency, 4),
+            'prompt_chars': len(prompt),
+            'recorded_at': time.time()
+        }, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def load_recordings(path):
+    """
+    读取记录文件
+
+    Args:
+        path: JSONL 文件路径
+
+    Returns:
+        {提示词键: [记录, ...]}，同一提示词多次记录时按记录顺序轮流回放
+    """
+    recordings = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            recordings.setdefault(entry['key'], []).append(entry)
+    return recordings
+
+
+_recorder = None
+
+
+def get_recorder():
+    """
+    获取进程内的记录器
+
+    Returns:
+        Recorder 实例，未设置 LLM_RECORD_PATH 时返回 None
+    """
+    global _recorder
+    if LLM_RECORD_PATH and _recorder is None:
+        _recorder = Recorder(LLM_RECORD_PATH)
+    return _recorder
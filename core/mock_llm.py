@@ -0,0 +1,345 @@
+'''
+@Project ：code 
+@File    ：mock_llm.py
+@Author  ：Sito
+@Date    ：2025/3/12 10:20 
+@Description    ：本地 LLM 模拟服务，兼容 /api/v3/chat/completions 协议，用于离线压测；
+envelope='ecloud' 时按移动云网关的格式在外层包上 state/body 信封
+'''
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from aiohttp import web
+
+CHAT_PATH = '/api/v3/chat/completions'
+
+
+def parse_latency(spec):
+    """
+    解析延迟分布描述
+
+    Args:
+        spec: 数字或字符串，支持 "0.5"、"fixed:0.5"、"uniform:0.2,1.0"、
+              "normal:均值,标准差"、"lognormal:中位数,sigma"
+
+    Returns:
+        (分布名, 参数元组)
+    """
+    if isinstance(spec, (int, float)):
+        return 'fixed', (float(spec),)
+    name, _, args = spec.partition(':')
+    if not args:
+        return 'fixed', (float(name),)
+    params = tuple(float(a) for a in args.split(','))
+    expected = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+    if name not in expected or len(params) != expected[name]:
+        raise ValueError(f"无法解析的延迟分布: {spec}")
+    return name, params
+
+
+class MockConfig:
+    """模拟服务的行为配置
+
+    属性:
+        latency (float | str): 每次请求的延迟（秒），也可以是分布描述，见 parse_latency
+        content (str): 返回给客户端的 message.content
+        max_concurrency (int): 同时处理的请求上限，超出时返回 429，None 表示不限
+        slow_ratio (float): 慢请求比例，用于模拟长尾
+        slow_latency (float): 慢请求的延迟（秒）
+        token_delay (float): 流式输出时每个分片之间的间隔（秒）
+        trailing_text (str): 追加在 content 之后的说明文字，模拟模型在 JSON 后继续输出
+        prefill_delay (float): 每 1000 个提示词字符增加的延迟（秒），模拟输入处理耗时
+        failing_models (set): 这些 model（端点）的请求一律返回 500
+        error_rate (float): 随机返回 500 的比例
+        throttle_rate (float): 随机返回 429 的比例
+        seed (int): 随机数种子，固定后延迟与错误注入可复现
+        replay (dict): llm_recorder.load_recordings 的结果，命中时返回录制的内容
+        replay_latency (bool): 回放时使用录制的延迟代替 latency
+        responder (callable): responder(model, prompt) 返回本次的 content，返回 None 时使用 content
+        model_latency (dict): 按 model 指定的延迟（秒），覆盖 latency
+        envelope (str): 'ecloud' 时响应包在移动云信封中，注入的错误以状态码 200、state 为 ERROR 返回；None 为 OpenAI 格式
+    """
+
+    def __init__(self, latency=0.05, content='{}', max_concurrency=None, slow_ratio=0.0, slow_latency=None,
+                 token_delay=0.0, trailing_text='', prefill_delay=0.0, failing_models=None,
+                 error_rate=0.0, throttle_rate=0.0, seed=None, replay=None, replay_latency=False,
+                 responder=None, model_latency=None, envelope=None):
+        self.envelope = envelope
+        self.responder = responder
+        self.model_latency = model_latency or {}
+        self.latency = latency
+        self.latency_dist = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.replay = replay
+        self.replay_latency = replay_latency
+        self._replay_cursor = {}
+        self.replay_hits = 0
+        self.replay_misses = 0
+        self.injected_errors = 0
+        self.failing_models = set(failing_models or ())
+        self.model_requests = {}
+        self.prefill_delay = prefill_delay
+        self.token_delay = token_delay
+        self.trailing_text = trailing_text
+        self.slow_ratio = slow_ratio
+        self.slow_latency = slow_latency
+        self.content = content
+        self.max_concurrency = max_concurrency
+        self.requests = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.disconnects = 0
+
+    def sample_latency(self):
+        if self.slow_ratio and self.random.random() < self.slow_ratio:
+            return self.slow_latency
+        name, params = self.latency_dist
+        if name == 'uniform':
+            return self.random.uniform(*params)
+        if name == 'normal':
+            return max(0.0, self.random.gauss(*params))
+        if name == 'lognormal':
+            median, sigma = params
+            return self.random.lognormvariate(math.log(median), sigma)
+        return params[0]
+
+    def lookup_replay(self, prompt):
+        """
+        按提示词查找录制的响应
+
+        Returns:
+            录制条目，未开启回放或未命中时返回 None
+        """
+        if self.replay is None:
+            return None
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        entries = self.replay.get(key)
+        if not entries:
+            self.replay_misses += 1
+            return None
+        self.replay_hits += 1
+        cursor = self._replay_cursor.get(key, 0)
+        self._replay_cursor[key] = cursor + 1
+        return entries[cursor % len(entries)]
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'injected_errors': self.injected_errors,
+            'peak_in_flight': self.peak_in_flight,
+            'disconnects': self.disconnects,
+            'replay_hits': self.replay_hits,
+            'replay_misses': self.replay_misses
+        }
+
+
+def build_completion(content, model='mock'):
+    """构造与 Ark 一致的非流式响应体"""
+    return {
+        "id": f"mock-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
+
+
+def ecloud_envelope(data, state='OK'):
+    """按移动云网关的格式包装响应，失败时没有 body"""
+    envelope = {"requestId": f"mock-{time.time_ns()}", "state": state}
+    if state == 'OK':
+        envelope["body"] = data
+    else:
+        envelope.update(errorCode=data["error"]["code"], errorMessage=f"mock {data['error']['code']}")
+    return envelope
+
+
+def wrap(config, data, state='OK'):
+    """按 config.envelope 包装响应体"""
+    return ecloud_envelope(data, state) if config.envelope == 'ecloud' else data
+
+
+def error_response(config, code, status):
+    """错误响应；移动云信封模式下网关以 200 返回，失败写在 state 中（限流仍为 429）"""
+    data = {"error": {"code": code}}
+    if config.envelope == 'ecloud' and status != 429:
+        return web.json_response(ecloud_envelope(data, 'ERROR'))
+    return web.json_response(data, status=status)
+
+
+def split_tokens(text, size=4):
+    """把文本切成固定长度的分片，近似模拟逐 token 输出"""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+async def stream_completion(request, config, model, text):
+    """以 SSE 格式逐片输出 text"""
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+    await response.prepare(request)
+    try:
+        for piece in split_tokens(text):
+            chunk = {
+                "id": "mock-stream",
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+            }
+            chunk = wrap(config, chunk)
+            await response.write(f'data: {json.dumps(chunk, ensure_ascii=False)}\n\n'.encode('utf-8'))
+            if config.token_delay:
+                await asyncio.sleep(config.token_delay)
+        await response.write(b'data: [DONE]\n\n')
+    except (ConnectionResetError, asyncio.CancelledError):
+        # 客户端拿到完整 JSON 后提前断开
+        config.disconnects += 1
+        return response
+    await response.write_eof()
+    return response
+
+
+def create_app(config=None):
+    """
+    创建模拟服务应用
+
+    Args:
+        config: MockConfig 实例，为 None 时使用默认配置
+
+    Returns:
+        aiohttp.web.Application
+    """
+    config = config or MockConfig()
+
+    async def chat_completions(request):
+        config.requests += 1
+        payload = await request.json()
+        model = payload.get('model', 'mock')
+        config.model_requests[model] = config.model_requests.get(model, 0) + 1
+        if model in config.failing_models:
+            await asyncio.sleep(config.sample_latency())
+            return error_response(config, "InternalServiceError", 500)
+        if config.max_concurrency is not None and config.in_flight >= config.max_concurrency \
+                or config.throttle_rate and config.random.random() < config.throttle_rate:
+            config.throttled += 1
+            return error_response(config, "RateLimitExceeded", 429)
+        config.in_flight += 1
+        config.peak_in_flight = max(config.peak_in_flight, config.in_flight)
+        try:
+            prompt = ''.join(m.get('content', '') for m in payload.get('messages', []))
+            entry = config.lookup_replay(prompt)
+            content = config.responder(model, prompt) if config.responder else None
+            if content is None:
+                content = entry['content'] if entry else config.content
+            text = content + config.trailing_text
+            if entry and config.replay_latency:
+                latency = entry['latency']
+            elif model in config.model_latency:
+                latency = config.model_latency[model]
+            else:
+                latency = config.sample_latency() + config.prefill_delay * len(prompt) / 1000
+            await asyncio.sleep(latency)
+            if config.error_rate and config.random.random() < config.error_rate:
+                config.injected_errors += 1
+                return error_response(config, "InternalServiceError", 500)
+            if payload.get('stream'):
+                return await stream_completion(request, config, model, text)
+            # 非流式请求同样需要等待全部内容生成完
+            await asyncio.sleep(config.token_delay * len(split_tokens(text)))
+        finally:
+            config.in_flight -= 1
+        return web.json_response(wrap(config, build_completion(text, model)))
+
+    app = web.Application()
+    app['config'] = config
+    app.router.add_post(CHAT_PATH, chat_completions)
+    return app
+
+
+class MockServer:
+    """在后台线程中运行模拟服务，便于在同步脚本中启动/停止"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or MockConfig()
+        self.host = host
+        self.port = port
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}{CHAT_PATH}'
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(create_app(self.config), access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port, backlog=4096)
+        self._loop.run_until_complete(site.start())
+        # 端口为 0 时取系统分配的实际端口
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 LLM 模拟服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', default='0.05', help='如 0.5、uniform:0.2,1.0、lognormal:0.8,0.5')
+    parser.add_argument('--content', default='{}', help='未命中回放时返回的内容')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--max-concurrency', type=int, default=None)
+    parser.add_argument('--token-delay', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--replay', default=None, help='LLM_RECORD_PATH 录制的 JSONL 文件')
+    parser.add_argument('--replay-latency', action='store_true', help='回放时使用录制的延迟')
+    parser.add_argument('--envelope', choices=['ecloud'], default=None, help='按移动云网关的格式包装响应')
+    args = parser.parse_args()
+
+    replay = None
+    if args.replay:
+        from core.llm_recorder import load_recordings
+        replay = load_recordings(args.replay)
+    config = MockConfig(latency=args.latency, content=args.content, max_concurrency=args.max_concurrency,
+                        token_delay=args.token_delay, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, seed=args.seed, replay=replay,
+                        replay_latency=args.replay_latency, envelope=args.envelope)
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
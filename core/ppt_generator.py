@@ -1140,6 +1140,38 @@ def add_data_content(content_frame, data: Dict[str, str]) -> None:
         run.font.color.rgb = COLORS['BLACK']
         run.font.bold = False
 
+def new_presentation() -> Presentation:
+    """创建16:9的空白PPT"""
+    prs = Presentation()
+    prs.slide_width = Inches(13.33)
+    prs.slide_height = Inches(7.5)
+    return prs
+
+
+def user_sort_key(item: Tuple[str, Dict[str, Any]]) -> Tuple[str, str]:
+    """用户在PPT中的顺序：按文档目录、受访者序号排序"""
+    user_id, user_data = item
+    return user_id.split('\\')[0], user_data['A. 年轻人生活状态探讨']['1、受访者']['序号']
+
+
+def add_user_slides(prs: Presentation, user_data: Dict[str, Any]) -> None:
+    """
+    为一个用户追加四页幻灯片
+
+    Args:
+        prs: PPT对象
+        user_data: 单个用户（文档）的JSON数据
+    """
+    # 从用户数据中提取标题信息
+    ppt_title = extract_slide_title(user_data)
+    # 提取用户信息
+    page = extract_json_info(user_data)
+    create_slide(prs, page['page1'], ppt_title)
+    create_slide2(prs, page['page2'], ppt_title)
+    create_slide3(prs, page['page3'], ppt_title)
+    create_slide4(prs, ppt_title)
+
+
 def process_json_file(json_file_path: str, output_dir: str) -> str:
     """
     处理单个JSON文件并生成PPT
@@ -1161,25 +1193,14 @@ def process_json_file(json_file_path: str, output_dir: str) -> str:
             data = json.load(f)
         
         # 创建新的PPT
-        prs = Presentation()
-        
-        # 设置幻灯片大小为16:9
-        prs.slide_width = Inches(13.33)
-        prs.slide_height = Inches(7.5)
+        prs = new_presentation()
 
-        data = dict(sorted(data.items(), key=lambda x: (x[0].split('\\')[0], x[1]['A. 年轻人生活状态探讨']['1、受访者']['序号'])))
+        data = dict(sorted(data.items(), key=user_sort_key))
         
 
         # 处理每个用户数据
         for user_id, user_data in data.items():
-            # 从用户数据中提取标题信息
-            ppt_title = extract_slide_title(user_data)
-            # 提取用户信息
-            page = extract_json_info(user_data)
-            create_slide(prs, page['page1'], ppt_title)
-            create_slide2(prs, page['page2'], ppt_title)
-            create_slide3(prs, page['page3'], ppt_title)
-            create_slide4(prs, ppt_title)
+            add_user_slides(prs, user_data)
         
         # 获取文件名（不含扩展名）
         file_name = os.path.splitext(os.path.basename(json_file_path))[0]
@@ -5,7 +5,9 @@
 @Date    ：2025/3/4 14:02 
 @Description    ：
 '''
+import re
 import json
+from functools import lru_cache
 
 deny_words = ['未明确','未提及','没有']
 
@@ -206,32 +208,158 @@ level_label = {
 }
 
 
-def get_extract_prompt(rt):
-    example = {
-        "A. 年轻人生活状态探讨": {
-            "1、受访者": {
-                "城市": "成都"
-            },
+def compact_json(obj):
+    """紧凑格式的 JSON，去掉缩进与分隔符后的空格"""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+EXTRACT_EXAMPLE = {
+    "A. 年轻人生活状态探讨": {
+        "1、受访者": {
+            "城市": "成都"
         },
-        "B. 波轮洗衣机购买全链路还原": {
-            "12、购买过程": {
-                "外观": "外观不在意，不拿来选美；材质要求不高"
-            }
+    },
+    "B. 波轮洗衣机购买全链路还原": {
+        "12、购买过程": {
+            "外观": "外观不在意，不拿来选美；材质要求不高"
         }
     }
-    extract_prompt = f'''你是一个信息提取大师，你会根据提供的标签和对应的访谈内容，提取出相应的信息。其中访谈内容, 包括了笔录和相应的表格记录, 你会根据提供的内容, 收集信息, 并以要求的 json 格式进行输入。
+}
+
+# 导入时编译一次的静态前缀，所有分块共享同一前缀，便于服务端前缀缓存
+EXTRACT_PROMPT_TEMPLATE = '''你是一个信息提取大师，你会根据提供的标签和对应的访谈内容，提取出相应的信息。其中访谈内容, 包括了笔录和相应的表格记录, 你会根据提供的内容, 收集信息, 并以要求的 json 格式进行输入。
 以下是你需要搜集的标签信息，其中包括了一级标签和一级标签下面的二级标签:
-{json.dumps(level_label, indent=4, ensure_ascii=False)}
+{schema}
 
 请你根据提供访谈的信息或相关的表格, 收集需要搜集的内容,并以json格式进行输出,。
 例如你发现了 "A. 年轻人生活状态探讨" 的 "1、受访者" 中二级标签 "城市" 是 “成都”, 并且"B. 波轮洗衣机购买全链路还原" 中 "12、购买过程" 中 "外观" 是 “外观不在意，不拿来选美；材质要求不高”，
 你只输出下面的json内容即可
-{json.dumps(example, indent=4, ensure_ascii=False)}
+{example}
 
 注意：没搜集到的内容不用输出，只输出搜集到的确切的内容，并且确保输出的json中的标签和提供的标签内容与格式保持一致，如果什么都没搜集到直接输出空json串即可。
+表格中单元格后的 [跨N列] 表示该单元格横跨 N 列，[同上] 表示与上一行同一位置的单元格合并、内容相同。
+
+下面是一些访谈的信息或相关的表格，请直接输出json:
+'''
+EXAMPLE_JSON = compact_json(EXTRACT_EXAMPLE)
+LEVEL_LABEL_JSON = compact_json(level_label)
+EXTRACT_PROMPT_PREFIX = EXTRACT_PROMPT_TEMPLATE.format(schema=LEVEL_LABEL_JSON, example=EXAMPLE_JSON)
+
+# 每个一级标签的子结构，路由时按需拼接
+SECTIONS = list(level_label.keys())
+SECTION_JSON = {section: json.dumps(section, ensure_ascii=False) + ':' + compact_json(level_label[section])
+                for section in SECTIONS}
+# 总结标签对任何分块都适用，始终保留
+ALWAYS_SECTIONS = ['总结标签']
+
+_CJK_RUN = re.compile(r'[一-鿿]+')
+
+
+def cjk_bigrams(text):
+    """提取文本中所有连续中文字符的二元组"""
+    grams = set()
+    for run in _CJK_RUN.findall(text):
+        for i in range(len(run) - 1):
+            grams.add(run[i:i + 2])
+    return grams
+
+
+def build_section_index():
+    """
+    根据 level_label 的各级标签名建立关键词索引
+
+    Returns:
+        {一级标签: {二元组: 权重}}，权重为 1/出现该二元组的一级标签数，越独有权重越高
+    """
+    grams = {}
+    for section, subs in level_label.items():
+        terms = cjk_bigrams(section)
+        for sub, leaves in subs.items():
+            terms |= cjk_bigrams(sub)
+            for leaf in leaves:
+                terms |= cjk_bigrams(leaf)
+        grams[section] = terms
+    df = {}
+    for terms in grams.values():
+        for gram in terms:
+            df[gram] = df.get(gram, 0) + 1
+    return {section: {gram: 1 / df[gram] for gram in terms} for section, terms in grams.items()}
+
+
+SECTION_INDEX = build_section_index()
+
+
+def route_sections(text, min_score=2.0):
+    """
+    选出分块可能填写的一级标签
+
+    Args:
+        text: 分块内容
+        min_score: 一级标签的最低匹配得分
+
+    Returns:
+        一级标签列表（保持 level_label 中的顺序）；没有任何标签达到阈值时返回全部
+    """
+    grams = cjk_bigrams(text)
+    picked = [section for section in SECTIONS if section not in ALWAYS_SECTIONS and
+              sum(weight for gram, weight in SECTION_INDEX[section].items() if gram in grams) >= min_score]
+    if not picked:
+        return SECTIONS
+    return [section for section in SECTIONS if section in picked or section in ALWAYS_SECTIONS]
+
+
+@lru_cache(maxsize=128)
+def get_prompt_prefix(sections):
+    """
+    按一级标签组合生成提示词前缀，相同组合复用同一前缀
+
+    Args:
+        sections: 一级标签元组
+
+    Returns:
+        提示词前缀文本
+    """
+    schema = '{' + ','.join(SECTION_JSON[section] for section in sections) + '}'
+    return EXTRACT_PROMPT_TEMPLATE.format(schema=schema, example=EXAMPLE_JSON)
+
+
+def get_extract_prompt(rt, sections=None):
+    """
+    生成信息提取提示词：静态前缀在前，分块内容在最后
+
+    Args:
+        rt: 分块内容
+        sections: 只提取这些一级标签，None 表示全部
+
+    Returns:
+        提示词文本
+    """
+    if sections is None or len(sections) == len(SECTIONS):
+        return EXTRACT_PROMPT_PREFIX + rt
+    return get_prompt_prefix(tuple(sections)) + rt
+
+
+PACKED_INSTRUCTION = '''以下内容包含 {n} 个分块，每个分块以 <<<分块k>>> 开头。请对每个分块分别提取，输出一个 json，键为 "分块1" 到 "分块{n}"，值为该分块按上述格式提取的结果，没搜集到内容的分块输出空json。
+'''
+
+
+def packed_key(k):
+    """合并请求中第 k 个分块（从 1 开始）在输出 json 中的键"""
+    return f'分块{k}'
+
+
+def get_packed_extract_prompt(texts, sections=None):
+    """
+    把多个分块合并进一个请求：静态前缀不变，分块以分隔符依次排列在最后
 
-下面是一些访谈的信息或相关的表格:
-{rt}
-你的输出'''
+    Args:
+        texts: 分块内容列表
+        sections: 只提取这些一级标签，None 表示全部
 
-    return extract_prompt
+    Returns:
+        提示词文本
+    """
+    body = PACKED_INSTRUCTION.format(n=len(texts))
+    for k, text in enumerate(texts, 1):
+        body += f'<<<{packed_key(k)}>>>\n{text}\n'
+    return get_extract_prompt(body, sections)
@@ -0,0 +1,260 @@
+'''
+@Project ：code 
+@File    ：providers.py
+@Author  ：Sito
+@Date    ：2025/3/21 15:00 
+@Description    ：LLM 服务商：每个服务商独立的连接池、并发限制与鉴权方式
+
+- ark / siliconflow：OpenAI 兼容接口，Bearer Token 鉴权
+- ecloud：移动云推理服务，请求参数需 HMAC 签名（见 sign()），响应外层包有 state/body 信封（见 EcloudProvider.unwrap()）
+'''
+import copy
+import hmac
+import json
+import time
+import uuid
+import asyncio
+import aiohttp
+import urllib.parse
+from hashlib import sha1, sha256
+from core.config import (HTTP_POOL_SIZE, HTTP_POOL_PER_HOST, HTTP_KEEPALIVE_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+                         LIMITER_INITIAL, LIMITER_MAX, LLM_PROVIDERS, logger_configuration)
+from core.limiter import AdaptiveLimiter
+
+logger = logger_configuration('providers')
+
+
+class ResponseError(Exception):
+    """服务商在响应体中明确返回失败（HTTP 状态码为 200）"""
+
+
+class Backend:
+    """一个可调用的模型端点：所属服务商 + 密钥 + 模型名
+
+    属性:
+        name (str): 模型名（Ark 为 endpoint ID），同时作为熔断登记与缓存键的名称
+    """
+
+    def __init__(self, provider, model, apikey=None):
+        self.provider = provider
+        self.model = model
+        self.apikey = apikey
+
+    @property
+    def name(self):
+        return self.model
+
+    def __repr__(self):
+        return f'Backend({self.provider.name}, {self.model})'
+
+
+class Provider:
+    """LLM 服务商基类，子类实现 prepare() 给出鉴权后的请求地址、请求头与查询参数
+
+    属性:
+        url (str): chat completions 接口地址
+        limiter (AdaptiveLimiter): 该服务商的并发限制，上限为 max_concurrency
+        pool_size (int): 连接池大小
+    """
+
+    def __init__(self, name, url, pool_size=HTTP_POOL_SIZE, max_concurrency=LIMITER_MAX):
+        self.name = name
+        self.url = url
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.limiter = AdaptiveLimiter(initial=min(LIMITER_INITIAL, max_concurrency), max_window=max_concurrency)
+        self.backends = []
+        # 每个事件循环一个 ClientSession（aiohttp 的连接池与事件循环绑定）
+        self._sessions = {}
+
+    def add_backend(self, model, apikey=None):
+        backend = Backend(self, model, apikey)
+        self.backends.append(backend)
+        return backend
+
+    def get_session(self):
+        """
+        获取当前事件循环中该服务商的 HTTP 会话，首次调用时创建连接池
+
+        Returns:
+            aiohttp.ClientSession 实例
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=min(self.pool_size, HTTP_POOL_PER_HOST),
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=HTTP_CONNECT_TIMEOUT,
+                sock_read=HTTP_READ_TIMEOUT
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._sessions[loop] = session
+        return session
+
+    async def close_session(self):
+        """关闭当前事件循环中该服务商的 HTTP 会话"""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    def prepare(self, backend, payload):
+        """
+        生成鉴权后的请求参数
+
+        Returns:
+            (url, headers, params)元组
+        """
+        raise NotImplementedError
+
+    def post(self, backend, payload):
+        """发送请求，返回 aiohttp 的请求上下文管理器"""
+        url, headers, params = self.prepare(backend, payload)
+        return self.get_session().post(url, headers=headers, params=params, json=payload)
+
+    def unwrap(self, data):
+        """
+        从解析后的响应体（或流式输出的一个分片）中取出 OpenAI 格式的部分，默认原样返回
+
+        Raises:
+            ResponseError: 服务商返回失败
+        """
+        return data
+
+    def parse_response(self, body):
+        """
+        解析非流式响应文本
+
+        Returns:
+            message.content
+
+        Raises:
+            ResponseError: 服务商返回失败
+        """
+        return self.unwrap(json.loads(body))['choices'][0]['message']['content']
+
+    def load(self):
+        """当前负载：在途与排队请求数相对并发窗口的比例"""
+        limiter = self.limiter
+        return (limiter.in_flight + limiter.queue_depth) / max(1, int(limiter.window))
+
+    def stats(self):
+        stats = self.limiter.stats()
+        stats['backends'] = [backend.name for backend in self.backends]
+        return stats
+
+
+class BearerProvider(Provider):
+    """OpenAI 兼容接口（Ark、SiliconFlow），Bearer Token 鉴权"""
+
+    def prepare(self, backend, payload):
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {backend.apikey}"
+        }
+        return self.url, headers, None
+
+
+def percent_encode(encode_str):
+    """移动云签名要求的参数编码"""
+    res = urllib.parse.quote(str(encode_str).encode('utf-8'), '')
+    res = res.replace('+', '%20')
+    res = res.replace('*', '%2A')
+    res = res.replace('%7E', '~')
+    return res
+
+
+def sign(http_method, params, servlet_path, secret_key):
+    """
+    计算移动云请求签名
+
+    Args:
+        http_method: 请求方法
+        params: 签名公参（不含 Signature）
+        servlet_path: 请求路径
+        secret_key: SecretKey
+
+    Returns:
+        十六进制签名
+    """
+    canonicalized_query_string = '&'.join(
+        percent_encode(k) + '=' + percent_encode(v) for k, v in sorted(params.items())
+    )
+    string_to_sign = http_method + '\n' \
+        + percent_encode(servlet_path) + '\n' \
+        + sha256(canonicalized_query_string.encode('utf-8')).hexdigest()
+    key = ("BC_SIGNATURE&" + secret_key).encode('utf-8')
+    return hmac.new(key, string_to_sign.encode('utf-8'), sha1).hexdigest()
+
+
+class EcloudProvider(Provider):
+    """移动云推理服务，每次请求重新生成时间戳、随机数与签名"""
+
+    def __init__(self, name, url, access_key, secret_key, **kwargs):
+        super().__init__(name, url, **kwargs)
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.path = urllib.parse.urlsplit(url).path
+
+    def prepare(self, backend, payload):
+        params = {
+            "AccessKey": self.access_key,
+            "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.localtime()),
+            "SignatureMethod": "HmacSHA1",
+            "SignatureNonce": uuid.uuid4().hex,
+            "SignatureVersion": "V2.0"
+        }
+        params['Signature'] = sign('POST', params, self.path, self.secret_key)
+        return self.url, {"Content-Type": "application/json"}, params
+
+    def unwrap(self, data):
+        """移动云网关的响应为 {"state": "OK", "body": 模型响应, ...}，state 不是 OK 时视为失败"""
+        if data.get('state') != 'OK':
+            raise ResponseError(f"state={data.get('state')}, errorCode={data.get('errorCode')}, "
+                                f"errorMessage={data.get('errorMessage')}")
+        body = data.get('body')
+        return json.loads(body) if isinstance(body, str) else body
+
+
+PROVIDER_TYPES = {
+    'ark': BearerProvider,
+    'siliconflow': BearerProvider,
+    'ecloud': EcloudProvider
+}
+
+
+def build_providers(specs=LLM_PROVIDERS, ark_backends=()):
+    """
+    按配置创建服务商
+
+    Args:
+        specs: 服务商配置列表，见 config.LLM_PROVIDERS
+        ark_backends: Ark 的 (apikey, endpoint) 列表，密钥由 genText 维护
+
+    Returns:
+        {服务商名称: Provider}，保持配置顺序，只包含 enabled 的服务商
+    """
+    providers = {}
+    for spec in specs:
+        spec = copy.deepcopy(spec)
+        if not spec.pop('enabled', True):
+            continue
+        kind = spec.pop('type')
+        models = spec.pop('models', [])
+        apikey = spec.pop('apikey', None)
+        provider = PROVIDER_TYPES[kind](**spec)
+        if kind == 'ark':
+            for key, endpoint in ark_backends:
+                provider.add_backend(endpoint, key)
+        for model in models:
+            provider.add_backend(model, apikey)
+        if provider.backends:
+            providers[provider.name] = provider
+        else:
+            logger.warning(f"服务商 {provider.name} 没有可用的模型，已忽略")
+    return providers
@@ -0,0 +1,169 @@
+'''
+@Project ：code 
+@File    ：scheduler.py
+@Author  ：Sito
+@Date    ：2025/3/25 10:00 
+@Description    ：LLM 请求的作业级公平调度
+
+所有发往 LLM 的请求都要先在服务商的 AdaptiveLimiter 中获取并发名额，
+限制器的等待队列使用 FairQueue：每个作业（一次 process_docx）一个队列，
+先按优先级出队，同一优先级内按权重平滑轮询，避免大批量作业占满名额。
+作业通过 contextvars 随协程传递，process_docx 中 set_job() 后创建的任务都归属该作业。
+'''
+import math
+import time
+import itertools
+import threading
+import contextvars
+from collections import deque
+from core.config import SCHEDULER_INTERACTIVE_PRIORITY, SCHEDULER_BATCH_PRIORITY, SCHEDULER_BATCH_WEIGHT_DOCS
+
+_job_ids = itertools.count(1)
+
+
+class Job:
+    """一次处理任务
+
+    属性:
+        name (str): 作业名称（如会话 ID）
+        priority (int): 优先级，数值越小越先出队
+        weight (int): 同一优先级内的轮询权重
+        llm_calls (int): 本作业的 genText 调用数
+        coalesced (int): 其中合并到在途相同请求的调用数
+    """
+
+    def __init__(self, name=None, priority=SCHEDULER_BATCH_PRIORITY, weight=1):
+        self.id = next(_job_ids)
+        self.name = name or f'job-{self.id}'
+        self.priority = priority
+        self.weight = max(1, weight)
+        self.created_at = time.time()
+        self.queued = 0
+        self.dispatched = 0
+        self.wait_time = 0.0
+        self.llm_calls = 0
+        self.coalesced = 0
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'priority': self.priority,
+            'weight': self.weight,
+            'queued': self.queued,
+            'dispatched': self.dispatched,
+            'avg_wait': round(self.wait_time / self.dispatched, 4) if self.dispatched else None,
+            'llm_calls': self.llm_calls,
+            'coalesced': self.coalesced
+        }
+
+
+# 未指定作业时（如命令行批处理）归入默认作业
+DEFAULT_JOB = Job('default')
+current_job = contextvars.ContextVar('llm_job', default=DEFAULT_JOB)
+
+# 正在进行的作业，供 /backends 查询
+_active_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def set_job(job):
+    """
+    把当前协程及其之后创建的任务归入 job
+
+    Returns:
+        contextvars.Token，可用于 finish_job 时恢复
+    """
+    with _jobs_lock:
+        _active_jobs[job.id] = job
+    return current_job.set(job)
+
+
+def finish_job(job, token=None):
+    """作业结束，移出活动列表"""
+    with _jobs_lock:
+        _active_jobs.pop(job.id, None)
+    if token is not None:
+        current_job.reset(token)
+
+
+def job_for(doc_count, name=None):
+    """
+    按文档数创建作业：单个文档视为交互式作业，优先出队；批量作业按文档数降低权重，
+    权重为 ceil(SCHEDULER_BATCH_WEIGHT_DOCS / 文档数)，至少为 1
+
+    Args:
+        doc_count: 本次处理的文档数
+
+    Returns:
+        Job 实例
+    """
+    if doc_count <= 1:
+        return Job(name, priority=SCHEDULER_INTERACTIVE_PRIORITY)
+    return Job(name, priority=SCHEDULER_BATCH_PRIORITY, weight=math.ceil(SCHEDULER_BATCH_WEIGHT_DOCS / doc_count))
+
+
+def scheduler_stats():
+    """正在进行的作业的排队与出队情况"""
+    with _jobs_lock:
+        jobs = list(_active_jobs.values())
+    return [job.to_dict() for job in jobs]
+
+
+class FairQueue:
+    """按作业分队列的等待队列，接口与 deque 的 append/popleft/remove 一致
+
+    元素入队时记录所属作业（current_job）；出队时先选优先级最高的作业，
+    同一优先级内按权重做平滑加权轮询（每轮各作业累加权重，取最大者并减去总权重）。
+    调用方负责加锁。
+    """
+
+    def __init__(self):
+        self._queues = {}
+        self._current = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, item):
+        job = current_job.get()
+        queue = self._queues.get(job)
+        if queue is None:
+            queue = self._queues[job] = deque()
+            self._current[job] = 0
+        queue.append((item, time.monotonic()))
+        job.queued += 1
+        self._size += 1
+
+    def popleft(self):
+        if not self._size:
+            raise IndexError('pop from an empty FairQueue')
+        top = min(job.priority for job in self._queues)
+        candidates = [job for job in self._queues if job.priority == top]
+        total = sum(job.weight for job in candidates)
+        for job in candidates:
+            self._current[job] += job.weight
+        job = max(candidates, key=lambda j: self._current[j])
+        self._current[job] -= total
+        item, enqueued_at = self._queues[job].popleft()
+        job.queued -= 1
+        job.dispatched += 1
+        job.wait_time += time.monotonic() - enqueued_at
+        self._size -= 1
+        if not self._queues[job]:
+            del self._queues[job]
+            del self._current[job]
+        return item
+
+    def remove(self, item):
+        for job, queue in self._queues.items():
+            for entry in queue:
+                if entry[0] == item:
+                    queue.remove(entry)
+                    job.queued -= 1
+                    self._size -= 1
+                    if not queue:
+                        del self._queues[job]
+                        del self._current[job]
+                    return
+        raise ValueError('item not in FairQueue')
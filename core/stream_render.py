@@ -0,0 +1,203 @@
+'''
+@Project ：code
+@File    ：stream_render.py
+@Author  ：Sito
+@Date    ：2025/3/31 10:00
+@Description    ：边提取边生成 Excel 与 PPT
+
+原流程在全部 LLM 请求完成后才依次展平 JSON、生成 Excel、生成 PPT，最后一个回复之后还要串行渲染所有文档。
+StreamRenderer 作为 process_docx 的 on_document 回调，每个文档合并完成即在后台线程中渲染：
+- Excel：表头行（STR1）由 level_label 确定，开始时写好；每个文档写入自己的一列（按文档顺序定位）
+- PPT：每个文档的四页幻灯片追加到同一份 PPT，保存前按 ppt_generator.user_sort_key 重新排序
+close() 等待渲染完成，补齐列宽与合并单元格后保存，输出与原流程一致。
+'''
+import os
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.config import logger_configuration
+from core.prompt_manager import level_label
+from core.flatten_aijson import JsonFlattener
+from core.excel_generator import ExcelGenerator
+from core.ppt_generator import new_presentation, add_user_slides, user_sort_key
+
+logger = logger_configuration('stream_render')
+
+
+class StreamRenderer:
+    """按文档完成的先后增量生成输出文件
+
+    属性:
+        formats (tuple): 需要生成的输出格式，'excel' / 'ppt'
+        output_dir (str): 输出目录
+        temp_output_dir (str): 展平结果 flattened_output.json 的目录，为 None 时不写
+    """
+
+    def __init__(self, output_dir, formats=('excel', 'ppt'), temp_output_dir=None,
+                 excel_filename='ai_transcript.xlsx', ppt_filename='ai_json_new.pptx'):
+        os.makedirs(output_dir, exist_ok=True)
+        self.formats = tuple(formats)
+        self.output_dir = output_dir
+        self.temp_output_dir = temp_output_dir
+        self.excel_path = os.path.join(output_dir, excel_filename)
+        self.ppt_path = os.path.join(output_dir, ppt_filename)
+        self.flattener = JsonFlattener(output_dir=temp_output_dir or output_dir)
+        self.documents = {}
+        self.slides = {}
+        self.futures = []
+        self.start = time.monotonic()
+        self.ready = None
+        self.timing = {'extract': [], 'excel': [], 'ppt': [], 'save': {}}
+        # 每种格式一个线程，保证同一文件的写入按提交顺序进行
+        self.executors = {fmt: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'render-{fmt}')
+                          for fmt in self.formats}
+        if 'excel' in self.formats:
+            self._begin_excel()
+        if 'ppt' in self.formats:
+            self.prs = new_presentation()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+        if 'excel' in self.formats:
+            self.excel.__exit__(exc_type, exc_val, exc_tb)
+
+    def _begin_excel(self):
+        """与 JsonFlattener 相同的方式由 level_label 生成表头行"""
+        skeleton = self.flattener.flatten_json({'': copy.deepcopy(level_label)})
+        _, self.h_keys, _ = self.flattener.generate_kd_sets(skeleton)
+        self.str1 = {v: k.split('##') for k, v in self.h_keys.items()}
+        self.str1_num = len(next(iter(self.str1.values()), []))
+        self.excel = ExcelGenerator().__enter__()
+        self.excel.setup_worksheet()
+        self.excel.process_str1_data(self.str1)
+
+    def add(self, idx, doc_path, result):
+        """
+        process_docx 的 on_document 回调：提交一个文档的渲染，立即返回
+
+        Args:
+            idx: 文档序号，决定 Excel 中的列
+            doc_path: 文档路径
+            result: 合并后的单文档结果
+        """
+        self.timing['extract'].append(self._now())
+        self.documents[idx] = (doc_path, result)
+        if 'excel' in self.formats:
+            self.futures.append(('excel', self.executors['excel'].submit(self._timed, 'excel', self._render_excel, idx, doc_path, result)))
+        if 'ppt' in self.formats:
+            self.futures.append(('ppt', self.executors['ppt'].submit(self._timed, 'ppt', self._render_ppt, idx, doc_path, result)))
+
+    def _now(self):
+        return time.monotonic() - self.start
+
+    def _timed(self, stage, render, *args):
+        start = self._now()
+        try:
+            return render(*args)
+        finally:
+            self.timing[stage].append((start, self._now()))
+
+    def _render_excel(self, idx, doc_path, result):
+        data = {}
+        for line in self.flattener.flatten_json({doc_path: result}):
+            parts = line.split('^')
+            h_part = '##'.join(parts[0].split('##')[1:])
+            if h_part not in self.h_keys:
+                logger.warning(f"{doc_path} 中的 {h_part} 不在 level_label 中，跳过")
+                continue
+            data[self.h_keys[h_part]] = parts[1]
+        self.excel.append_str2_column(idx + 1, data, self.str1_num)
+
+    def _render_ppt(self, idx, doc_path, result):
+        slide_ids = self.prs.slides._sldIdLst
+        count = len(slide_ids)
+        add_user_slides(self.prs, result)
+        self.slides[idx] = list(slide_ids)[count:]
+
+    def close(self):
+        """
+        等待全部渲染完成并保存
+
+        Returns:
+            输出文件名字典，与原流程一致：{'excel': 文件名, 'ppt': [文件名]}
+        """
+        failed = set()
+        for fmt, future in self.futures:
+            try:
+                future.result()
+            except Exception as e:
+                if fmt == 'excel':
+                    print(f"生成Excel文件时发生错误: {str(e)}")
+                    raise
+                print(f"生成PPT时发生错误: {str(e)}")
+                failed.add(fmt)
+        order = sorted(self.documents)
+        output_files = {}
+        if 'excel' in self.formats:
+            start = time.monotonic()
+            self._save_excel(order)
+            self.timing['save']['excel'] = time.monotonic() - start
+            output_files['excel'] = os.path.basename(self.excel_path)
+        if 'ppt' in self.formats and 'ppt' not in failed and order:
+            start = time.monotonic()
+            try:
+                self._save_ppt()
+                output_files['ppt'] = [os.path.basename(self.ppt_path)]
+            except Exception as e:
+                print(f"生成PPT时发生错误: {str(e)}")
+            self.timing['save']['ppt'] = time.monotonic() - start
+        if self.temp_output_dir:
+            flattened = []
+            for idx in order:
+                doc_path, result = self.documents[idx]
+                flattened.extend(self.flattener.flatten_json({doc_path: result}))
+            if flattened:
+                self.flattener.build_output(flattened)
+        self.ready = self._now()
+        print(f'[stream_render] stage timing : {self.stats()}')
+        return output_files
+
+    def _save_excel(self, order):
+        # 没有结果的文档不占列，与原流程一致
+        for idx in range(max(order, default=-1), -1, -1):
+            if idx not in self.documents:
+                self.excel.ws.delete_cols(self.str1_num + idx + 1)
+        self.excel.configure_column_widths(str1_num=self.str1_num, str2_count=len(order))
+        ExcelGenerator.merge_duplicate_cells(
+            worksheet=self.excel.ws,
+            start_row=self.excel.config.merge_start_row,
+            end_row=len(self.str1),
+            end_col=self.str1_num
+        )
+        self.excel.save(self.excel_path)
+
+    def _save_ppt(self):
+        # 按原流程的用户顺序重排幻灯片
+        slide_ids = self.prs.slides._sldIdLst
+        users = sorted(((self.documents[idx], idx) for idx in self.slides), key=lambda x: user_sort_key(x[0]))
+        for _, idx in users:
+            for slide_id in self.slides[idx]:
+                slide_ids.remove(slide_id)
+                slide_ids.append(slide_id)
+        self.prs.save(self.ppt_path)
+        print(f"已生成PPT: {self.ppt_path}")
+
+    def stats(self):
+        """各阶段相对创建时刻的起止时间（秒），tail 为最后一个文档提取完成到输出就绪的时间"""
+        stats = {}
+        if self.timing['extract']:
+            stats['extract'] = {'first': round(min(self.timing['extract']), 2), 'last': round(max(self.timing['extract']), 2)}
+        for stage in ('excel', 'ppt'):
+            spans = self.timing[stage]
+            if spans:
+                stats[stage] = {'busy': round(sum(end - start for start, end in spans), 2),
+                                'first': round(min(start for start, _ in spans), 2),
+                                'last': round(max(end for _, end in spans), 2)}
+        stats['save'] = {fmt: round(seconds, 2) for fmt, seconds in self.timing['save'].items()}
+        if self.timing['extract'] and self.ready is not None:
+            stats['tail'] = round(self.ready - max(self.timing['extract']), 2)
+        return stats
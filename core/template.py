@@ -0,0 +1,121 @@
+'''
+@Project ：code 
+@File    ：template.py
+@Author  ：Sito
+@Date    ：2025/3/30 10:00 
+@Description    ：识别并去掉一批访谈文档共有的模板内容
+
+同一项目的笔录套用同一份问卷骨架：项目信息、未填写的占位行、章节标题等在每份文档中完全相同，
+对提取没有帮助却每次都计入提示词。按整行（表格行）与整段（正文段落）统计在多少份文档中出现，
+出现在至少 TEMPLATE_MIN_DOC_RATIO 的文档中的视为模板并在分块前去掉：
+- 表格的第一行（表头）始终保留，作为后续行的列名
+- 除表头外全部是模板行的表格整表去掉
+- 只要一行中有一个单元格与其他文档不同（如受访者的回答），该行就保留
+
+保留行中的问题单元格不压缩为短引用（如在提示词前缀中定义一次 Q<n>）：每个问题在一份文档中只出现一次，
+前缀中的定义每个分块的请求都要带上，不会比原文更省；该功能暂不实现。
+'''
+import math
+import hashlib
+from collections import Counter
+from core.chunker import CELL_SEPARATOR, estimate_tokens, format_row
+from core.config import TEMPLATE_MIN_DOCS, TEMPLATE_MIN_DOC_RATIO
+
+
+def row_signature(row):
+    return hashlib.blake2b(CELL_SEPARATOR.join(row).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def paragraph_signature(text):
+    return hashlib.blake2b(('\n' + text).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def block_signatures(blocks):
+    """
+    一个文档中出现的行与段落签名（表头与空段落不计入）
+
+    Args:
+        blocks: ('table', 行列表) 或 ('paragraph', 段落文本) 的序列
+
+    Returns:
+        签名集合
+    """
+    signatures = set()
+    for kind, content in blocks:
+        if kind == 'table':
+            signatures.update(row_signature(row) for row in content[1:])
+        elif content.strip():
+            signatures.add(paragraph_signature(content.strip()))
+    return signatures
+
+
+class Template:
+    """一批文档共有的模板行与段落
+
+    属性:
+        signatures (frozenset): 模板行与段落的签名
+        documents (int): 学习时的文档数
+        digest (str): 模板内容的哈希，作为缓存键的一部分
+    """
+
+    def __init__(self, signatures, documents):
+        self.signatures = frozenset(signatures)
+        self.documents = documents
+        self.digest = hashlib.sha256(''.join(sorted(self.signatures)).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def learn(cls, document_signatures, min_docs=TEMPLATE_MIN_DOCS, min_ratio=TEMPLATE_MIN_DOC_RATIO):
+        """
+        从一批文档的签名集合中学习模板
+
+        Args:
+            document_signatures: 每个文档的 block_signatures
+            min_docs: 文档数少于该值时不识别模板
+            min_ratio: 在至少这一比例的文档中出现才算模板
+
+        Returns:
+            Template 实例，文档数不足时返回 None
+        """
+        document_signatures = list(document_signatures)
+        if len(document_signatures) < min_docs:
+            return None
+        counts = Counter(signature for signatures in document_signatures for signature in signatures)
+        threshold = max(2, math.ceil(min_ratio * len(document_signatures)))
+        return cls({signature for signature, count in counts.items() if count >= threshold}, len(document_signatures))
+
+    def filter_blocks(self, blocks, saved=None):
+        """
+        去掉模板行与段落，逐个生成剩余的内容块
+
+        Args:
+            blocks: ('table', 行列表) 或 ('paragraph', 段落文本) 的序列，可以是生成器
+            saved: 传入字典时累计去掉的 rows / paragraphs / tables / tokens
+
+        Yields:
+            同 blocks
+        """
+        saved = saved if saved is not None else {}
+        for kind, content in blocks:
+            if kind == 'paragraph':
+                if content.strip() and paragraph_signature(content.strip()) in self.signatures:
+                    saved['paragraphs'] = saved.get('paragraphs', 0) + 1
+                    saved['tokens'] = saved.get('tokens', 0) + estimate_tokens(content)
+                    continue
+                yield kind, content
+                continue
+            kept = content[:1]
+            for row in content[1:]:
+                if row_signature(row) in self.signatures:
+                    saved['rows'] = saved.get('rows', 0) + 1
+                    saved['tokens'] = saved.get('tokens', 0) + estimate_tokens(format_row(row))
+                else:
+                    kept.append(row)
+            if len(content) > 1 and len(kept) == 1:
+                # 除表头外都是模板：整表去掉
+                saved['tables'] = saved.get('tables', 0) + 1
+                saved['tokens'] = saved.get('tokens', 0) + estimate_tokens(format_row(kept[0]))
+                continue
+            yield kind, kept
+
+    def to_dict(self):
+        return {'signatures': len(self.signatures), 'documents': self.documents}
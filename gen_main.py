@@ -6,6 +6,8 @@ from core.flatten_aijson import JsonFlattener
 from core.excel_generator import generate_excel
 from core.ppt_generator import generate_ppt
 from core.ai_core import process_docx
+from core.stream_render import StreamRenderer
+from core.config import RENDER_PIPELINE_ENABLED
 
 
 def main():
@@ -35,6 +37,24 @@ def main():
         # 第一步：处理Word文档并生成JSON数据
         print("开始处理Word文档...")
         ai_output_dir = os.path.join(base_dir, input_path)
+        if RENDER_PIPELINE_ENABLED:
+            # 每个文档提取完成即渲染其 Excel 列与 PPT 页
+            with StreamRenderer(config['output_dir'], temp_output_dir=config['temp_output_dir'],
+                                excel_filename=config['excel_output_file']) as renderer:
+                asyncio.run(process_docx(
+                    input_dir=docx_input_path,
+                    output_dir=ai_output_dir,
+                    output_filename='ai_json.json',
+                    on_document=renderer.add
+                ))
+                output_files = renderer.close()
+            print(f"✓ Word文档处理完成，JSON数据保存在：{ai_output_dir}")
+            print(f"✓ 输出文件保存在：{config['output_dir']}")
+            for file_name in [output_files.get('excel')] + output_files.get('ppt', []):
+                if file_name:
+                    print(f"  - {file_name}")
+            return
+
         asyncio.run(process_docx(
             input_dir=docx_input_path,
             output_dir=ai_output_dir,